@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import re
+import secrets
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+from database import trial_signups_collection
+from models import TRIAL_DURATION
+
+logger = logging.getLogger(__name__)
+
+ACTIVATION_FILTER_CAPACITY = int(os.environ.get('ACTIVATION_FILTER_CAPACITY', '1000000'))
+ACTIVATION_FILTER_FP_RATE = float(os.environ.get('ACTIVATION_FILTER_FP_RATE', '0.001'))
+ACTIVATION_FILTER_REFRESH_SECONDS = int(os.environ.get('ACTIVATION_FILTER_REFRESH_SECONDS', '60'))
+ACTIVATION_FILTER_OVERLAP_SECONDS = int(os.environ.get('ACTIVATION_FILTER_OVERLAP_SECONDS', '30'))
+ACTIVATION_FILTER_CATCHUP_SECONDS = float(os.environ.get('ACTIVATION_FILTER_CATCHUP_SECONDS', '1'))
+
+# Codes are issued as secrets.token_hex(16)
+ACTIVATION_CODE_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    `might_contain` never returns False for an added item, so a negative
+    answer lets a lookup be rejected without touching the database.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.size = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def might_contain(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class ActivationFilter:
+    """Negative-lookup filter over every activation code issued so far.
+
+    Each worker keeps its own filter, loaded in full once and then topped up
+    from an `activation_code_issued_at` high-water mark. A code another
+    worker issued after the last top-up is missing from this filter, so a
+    miss triggers a top-up before the code is rejected. To keep guesses
+    off the database, misses share any top-up already in flight and
+    trigger at most one new top-up per ACTIVATION_FILTER_CATCHUP_SECONDS.
+    Only a code issued by another worker within that window of the last
+    top-up can be turned away, and retrying after the window admits it.
+    """
+
+    def __init__(self, capacity: int = ACTIVATION_FILTER_CAPACITY, fp_rate: float = ACTIVATION_FILTER_FP_RATE):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.bloom = BloomFilter(capacity, fp_rate)
+        self.loaded = False
+        self.high_water: Optional[datetime] = None
+        self._added_during_rebuild = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._refresh_started = 0.0
+        # Monotonic start time of the last load that completed
+        self._fresh_as_of = float("-inf")
+        self.stats = {"rejected_format": 0, "rejected_filter": 0, "passed": 0, "caught_up": 0, "refreshes": 0}
+
+    def add(self, code: str):
+        self.bloom.add(code)
+        if self._added_during_rebuild is not None:
+            self._added_during_rebuild.append(code)
+
+    def _advance(self, issued_at: Optional[datetime]):
+        if issued_at is not None and (self.high_water is None or issued_at > self.high_water):
+            self.high_water = issued_at
+
+    async def admits(self, code: str) -> bool:
+        """False when the code is certainly unknown; True means check the database"""
+        if not ACTIVATION_CODE_PATTERN.match(code):
+            self.stats["rejected_format"] += 1
+            return False
+        # Until the first load finishes every well-formed code goes to the database
+        if self.loaded and not self.bloom.might_contain(code):
+            try:
+                await self._catch_up()
+            except Exception as e:
+                # Without a current filter the database has to answer
+                logger.warning("Activation filter top-up failed: %s", e)
+                self.stats["passed"] += 1
+                return True
+            if not self.bloom.might_contain(code):
+                self.stats["rejected_filter"] += 1
+                return False
+            self.stats["caught_up"] += 1
+        self.stats["passed"] += 1
+        return True
+
+    async def _catch_up(self):
+        task = self._refresh_task
+        if task is not None:
+            await asyncio.shield(task)
+        elif time.monotonic() - self._fresh_as_of >= ACTIVATION_FILTER_CATCHUP_SECONDS:
+            await self.refresh()
+
+    async def refresh(self):
+        """Bring the filter up to date with a load that starts after this call.
+
+        Concurrent callers share one database query.
+        """
+        requested = time.monotonic()
+        while True:
+            task = self._refresh_task
+            if task is None:
+                started = self._refresh_started = time.monotonic()
+                task = self._refresh_task = asyncio.ensure_future(self._load())
+                task.add_done_callback(lambda finished: self._refresh_done(finished, started))
+                await asyncio.shield(task)
+                return
+            started = self._refresh_started
+            try:
+                await asyncio.shield(task)
+            except Exception:
+                if started >= requested:
+                    raise
+            if started >= requested:
+                return
+
+    def _refresh_done(self, task: asyncio.Task, started: float):
+        if self._refresh_task is task:
+            self._refresh_task = None
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.debug("Activation filter load failed: %s", task.exception())
+        else:
+            self._fresh_as_of = max(self._fresh_as_of, started)
+
+    async def _load(self):
+        self.stats["refreshes"] += 1
+        if self.loaded:
+            await self._load_new()
+        else:
+            await self.rebuild()
+
+    async def _load_new(self):
+        # The overlap absorbs clock skew between the workers stamping issued_at
+        since = self.high_water - timedelta(seconds=ACTIVATION_FILTER_OVERLAP_SECONDS)
+        cursor = trial_signups_collection.find(
+            {"activation_code_issued_at": {"$gte": since}},
+            {"_id": 0, "activation_code": 1, "activation_code_issued_at": 1}
+        )
+        async for trial in cursor:
+            if not self.bloom.might_contain(trial["activation_code"]):
+                self.bloom.add(trial["activation_code"])
+            self._advance(trial["activation_code_issued_at"])
+
+    async def rebuild(self):
+        """Reload the filter from every code stored in the database"""
+        bloom = BloomFilter(self.capacity, self.fp_rate)
+        high_water = self.high_water
+        self.high_water = datetime.utcnow()
+        self._added_during_rebuild = []
+        try:
+            cursor = trial_signups_collection.find(
+                {"activation_code": {"$type": "string"}},
+                {"_id": 0, "activation_code": 1, "activation_code_issued_at": 1}
+            ).batch_size(10000)
+            async for trial in cursor:
+                bloom.add(trial["activation_code"])
+                self._advance(trial.get("activation_code_issued_at"))
+            # Codes issued while the cursor was running may have been missed by it
+            for code in self._added_during_rebuild:
+                bloom.add(code)
+        except Exception:
+            self.high_water = high_water
+            raise
+        finally:
+            self._added_during_rebuild = None
+        self.bloom = bloom
+        self.loaded = True
+        logger.info("Activation filter loaded with %s codes", bloom.count)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "codes": self.bloom.count,
+            "loaded": self.loaded,
+            "high_water": self.high_water.isoformat() if self.high_water else None
+        }
+
+
+activation_filter = ActivationFilter()
+
+
+def issue_activation_code() -> dict:
+    """Fields for a newly issued activation code, which is added to this worker's filter"""
+    code = secrets.token_hex(16)
+    activation_filter.add(code)
+    return {"activation_code": code, "activation_code_issued_at": datetime.utcnow()}
+
+
+async def ensure_activation_indexes():
+    """Create the unique sparse index on activation codes and the issue-time index"""
+    await trial_signups_collection.create_index("activation_code", unique=True, sparse=True)
+    await trial_signups_collection.create_index("activation_code_issued_at", sparse=True)
+
+
+async def activation_filter_loop():
+    """Load the filter, then periodically top it up with codes issued by other workers"""
+    while True:
+        try:
+            await activation_filter.refresh()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error refreshing activation filter: %s", e)
+        await asyncio.sleep(ACTIVATION_FILTER_REFRESH_SECONDS)
+
+
+def _unexpired(now: datetime) -> dict:
+    return {
+        "status": "active",
+        "$or": [
+            {"trial_end": {"$gt": now}},
+            # Trials stored before trial_end was set at signup last a trial length from trial_start
+            {"trial_end": None, "trial_start": {"$gt": now - TRIAL_DURATION}}
+        ]
+    }
+
+
+async def redeem_activation_code(code: str) -> Optional[dict]:
+    """Atomically mark the unexpired trial owning code as activated.
+
+    Returns the trial as it was before redemption, or None if no unredeemed,
+    unexpired trial has the code; redemption_failure then says why.
+    """
+    now = datetime.utcnow()
+    return await trial_signups_collection.find_one_and_update(
+        {"activation_code": code, "activated": {"$ne": True}, **_unexpired(now)},
+        {"$set": {"activated": True, "updated_at": now}},
+        projection={"_id": 0, "email_key": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+
+
+async def redemption_failure(code: str) -> Optional[str]:
+    """Why code could not be redeemed: "redeemed", "expired", or None if unknown"""
+    trial = await trial_signups_collection.find_one(
+        {"activation_code": code}, {"_id": 0, "activated": 1}
+    )
+    if trial is None:
+        return None
+    if trial.get("activated"):
+        return "redeemed"
+    return "expired"
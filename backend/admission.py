@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Per route class: max concurrent requests, max queued requests, max queue wait (seconds)
+DEFAULT_LIMITS = {
+    "health": {"limit": 64, "queue": 0, "timeout": 0.0},
+    "catalog": {"limit": 128, "queue": 512, "timeout": 1.0},
+    "write": {"limit": 16, "queue": 64, "timeout": 2.0},
+    "default": {"limit": 32, "queue": 128, "timeout": 2.0}
+}
+
+# (methods, path prefix, route class); first match wins
+ROUTE_CLASSES: List[Tuple[Optional[set], str, str]] = [
+    (None, "/api/health", "health"),
+    ({"GET", "HEAD"}, "/api/plans", "catalog"),
+    ({"GET", "HEAD"}, "/api/features", "catalog"),
+    ({"GET", "HEAD"}, "/api/settings", "catalog"),
+    ({"GET", "HEAD"}, "/api/plan-features", "catalog"),
+    ({"POST", "PUT", "PATCH", "DELETE"}, "/api/", "write")
+]
+
+
+def _load_limits() -> Dict[str, dict]:
+    limits = {name: dict(config) for name, config in DEFAULT_LIMITS.items()}
+    # e.g. ADMISSION_LIMITS='{"write": {"limit": 8, "queue": 32, "timeout": 1.0}}'
+    overrides = json.loads(os.environ.get('ADMISSION_LIMITS', '{}'))
+    for name, config in overrides.items():
+        limits.setdefault(name, dict(DEFAULT_LIMITS["default"])).update(config)
+    return limits
+
+
+class RouteClassLimiter:
+    """Concurrency limit with a bounded wait queue and a queueing deadline"""
+
+    def __init__(self, name: str, limit: int, queue: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.stats = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+
+    async def acquire(self) -> bool:
+        """Admit the request, or return False if it should be shed"""
+        if self._semaphore.locked():
+            if self.waiting >= self.queue:
+                self.stats["rejected_queue_full"] += 1
+                return False
+            self.stats["queued"] += 1
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self.stats["rejected_timeout"] += 1
+                return False
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+        self.stats["admitted"] += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.timeout))
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "limit": self.limit,
+            "queue_limit": self.queue
+        }
+
+
+class AdmissionController:
+    """Classify requests into route classes and hold one limiter per class"""
+
+    def __init__(self, limits: Optional[Dict[str, dict]] = None, route_classes=None):
+        limits = limits or _load_limits()
+        self.route_classes = route_classes or ROUTE_CLASSES
+        self.limiters = {
+            name: RouteClassLimiter(name, **config) for name, config in limits.items()
+        }
+
+    def classify(self, method: str, path: str) -> RouteClassLimiter:
+        for methods, prefix, name in self.route_classes:
+            if (methods is None or method in methods) and path.startswith(prefix):
+                return self.limiters[name]
+        return self.limiters["default"]
+
+    def snapshot(self) -> dict:
+        return {name: limiter.snapshot() for name, limiter in self.limiters.items()}
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware shedding excess load with an early 503 + Retry-After"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.controller.classify(scope["method"], scope["path"])
+        if not await limiter.acquire():
+            logger.warning("Shedding %s %s (%s queue depth %s)",
+                           scope["method"], scope["path"], limiter.name, limiter.waiting)
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry shortly"},
+                status_code=503,
+                headers={
+                    "Retry-After": str(limiter.retry_after()),
+                    "X-Queue-Depth": str(limiter.waiting)
+                }
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+admission_controller = AdmissionController()
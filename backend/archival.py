@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from identity import email_key
+from models import TRIAL_DURATION
+from contact_partitions import partitions_between, drop_expired_partitions
+from database import (
+    db,
+    insert_many_skipping_duplicates,
+    trial_signups_collection,
+    contact_messages_archive_collection,
+    trial_signups_archive_collection
+)
+
+logger = logging.getLogger(__name__)
+
+# Archival configuration
+CONTACT_ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_CONTACT_AFTER_DAYS', '90'))
+TRIAL_ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_TRIAL_AFTER_DAYS', '30'))
+ARCHIVE_PURGE_AFTER_DAYS = int(os.environ.get('ARCHIVE_PURGE_AFTER_DAYS', '365'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '500'))
+ARCHIVE_INTERVAL_SECONDS = int(os.environ.get('ARCHIVE_INTERVAL_SECONDS', '3600'))
+
+
+class ArchiveTier:
+    """Hot collections paired with an archive and the rule for aging out"""
+
+    def __init__(self, name, hot_collections, archive, age_days, query_builder):
+        self.name = name
+        self.hot_collections = hot_collections
+        self.archive = archive
+        self.age_days = age_days
+        self.query_builder = query_builder
+
+    def cutoff(self, now: datetime) -> datetime:
+        return now - timedelta(days=self.age_days)
+
+
+async def _contact_collections(cutoff: datetime) -> list:
+    # Only monthly partitions that start before the cutoff can hold expired messages
+    return [db[name] for name in await partitions_between(end=cutoff)]
+
+
+async def _trial_collections(cutoff: datetime) -> list:
+    return [trial_signups_collection]
+
+
+def _contact_query(cutoff: datetime) -> dict:
+    return {"status": "replied", "created_at": {"$lt": cutoff}}
+
+
+def _trial_query(cutoff: datetime) -> dict:
+    return {
+        "$or": [
+            {"trial_end": {"$lt": cutoff}},
+            # Trials stored before trial_end was set at signup expire a trial length after they started
+            {"trial_end": None, "trial_start": {"$lt": cutoff - TRIAL_DURATION}},
+            {"status": {"$in": ["expired", "cancelled"]}, "updated_at": {"$lt": cutoff}}
+        ]
+    }
+
+
+ARCHIVE_TIERS = {
+    "contact": ArchiveTier(
+        "contact",
+        _contact_collections,
+        contact_messages_archive_collection,
+        CONTACT_ARCHIVE_AFTER_DAYS,
+        _contact_query
+    ),
+    "trial": ArchiveTier(
+        "trial",
+        _trial_collections,
+        trial_signups_archive_collection,
+        TRIAL_ARCHIVE_AFTER_DAYS,
+        _trial_query
+    )
+}
+
+
+async def ensure_archive_indexes():
+    """Create lookup and TTL purge indexes on the archive collections"""
+    await trial_signups_collection.create_index("trial_end")
+    await trial_signups_collection.create_index("trial_start")
+    for tier in ARCHIVE_TIERS.values():
+        await tier.archive.create_index("id", unique=True)
+        await tier.archive.create_index("email_key")
+        await tier.archive.create_index(
+            "archived_at",
+            expireAfterSeconds=ARCHIVE_PURGE_AFTER_DAYS * 24 * 3600
+        )
+
+
+async def _archive_batch(tier: ArchiveTier, hot, query: dict, archived_at: datetime) -> int:
+    documents = await hot.find(query).limit(ARCHIVE_BATCH_SIZE).to_list(ARCHIVE_BATCH_SIZE)
+    if not documents:
+        return 0
+
+    for document in documents:
+        document["archived_at"] = archived_at
+        if "email_key" not in document and "email" in document:
+            document["email_key"] = email_key(document["email"])
+    # Documents copied by an interrupted earlier run are already archived
+    await insert_many_skipping_duplicates(tier.archive, documents)
+
+    await hot.delete_many({"_id": {"$in": [document["_id"] for document in documents]}})
+    return len(documents)
+
+
+async def archive_tier(tier: ArchiveTier, now: Optional[datetime] = None) -> int:
+    """Move every document past the tier's age threshold into its archive"""
+    now = now or datetime.utcnow()
+    cutoff = tier.cutoff(now)
+    query = tier.query_builder(cutoff)
+    total = 0
+    for hot in await tier.hot_collections(cutoff):
+        while True:
+            moved = await _archive_batch(tier, hot, query, now)
+            total += moved
+            if moved < ARCHIVE_BATCH_SIZE:
+                break
+    if total:
+        logger.info("Archived %s %s documents", total, tier.name)
+    return total
+
+
+async def run_archival(now: Optional[datetime] = None) -> dict:
+    """Run one archival pass over all tiers"""
+    return {name: await archive_tier(tier, now) for name, tier in ARCHIVE_TIERS.items()}
+
+
+async def archival_loop():
+    """Periodically run archival passes until cancelled"""
+    while True:
+        try:
+            await run_archival()
+            await drop_expired_partitions()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error running archival pass: %s", e)
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+
+async def find_archived(kind: str, email: Optional[str] = None, limit: int = 100) -> List[dict]:
+    """Read archived documents of one kind, newest first"""
+    tier = ARCHIVE_TIERS[kind]
+    query = {"email_key": email_key(email)} if email else {}
+    return await tier.archive.find(query, {"_id": 0, "email_key": 0}).sort("archived_at", -1).to_list(limit)
@@ -0,0 +1,87 @@
+"""Measure event-loop stall time caused by logging to a slow sink.
+
+Runs the same logging workload twice, once with a synchronous handler and
+once through the queue pipeline from log_config, and reports how far a
+1ms ticker coroutine fell behind schedule in each case.
+
+    python benchmark_logging.py --messages 500 --sink-delay-ms 2
+"""
+import asyncio
+import logging
+import queue
+import time
+from logging.handlers import QueueListener
+
+import typer
+
+from log_config import DeferredQueueHandler, JsonFormatter
+
+
+class SlowHandler(logging.Handler):
+    """Handler whose emit blocks, standing in for a congested log sink"""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.setFormatter(JsonFormatter())
+
+    def emit(self, record):
+        self.format(record)
+        time.sleep(self.delay)
+
+
+async def _measure(logger: logging.Logger, messages: int) -> dict:
+    stalls = []
+    done = asyncio.Event()
+
+    async def ticker():
+        interval = 0.001
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            stalls.append(max(0.0, time.perf_counter() - start - interval))
+
+    async def workload():
+        for i in range(messages):
+            logger.error("Error handling request %s: %s", i, "simulated failure")
+            await asyncio.sleep(0)
+        done.set()
+
+    await asyncio.gather(ticker(), workload())
+    return {
+        "total_stall_ms": sum(stalls) * 1000,
+        "max_stall_ms": max(stalls, default=0.0) * 1000
+    }
+
+
+def run(messages: int, sink_delay_ms: float) -> dict:
+    sink = SlowHandler(sink_delay_ms / 1000)
+    results = {}
+
+    logger = logging.getLogger("benchmark.sync")
+    logger.propagate = False
+    logger.addHandler(sink)
+    results["sync"] = asyncio.run(_measure(logger, messages))
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, sink)
+    logger = logging.getLogger("benchmark.queued")
+    logger.propagate = False
+    logger.addHandler(DeferredQueueHandler(log_queue))
+    listener.start()
+    results["queued"] = asyncio.run(_measure(logger, messages))
+    listener.stop()
+    return results
+
+
+def main(
+    messages: int = typer.Option(500, help="Log records emitted per run"),
+    sink_delay_ms: float = typer.Option(2.0, help="Time the sink blocks per record")
+):
+    """Compare event-loop stall with synchronous and queued logging"""
+    for mode, stats in run(messages, sink_delay_ms).items():
+        typer.echo(f"{mode:>7}: total stall {stats['total_stall_ms']:.1f}ms, max stall {stats['max_stall_ms']:.1f}ms")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,159 @@
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from pymongo import ReturnDocument
+
+from models import PlanFeature, SubscriptionPlan
+from database import (
+    insert_many_skipping_duplicates,
+    subscription_plans_collection,
+    features_collection,
+    app_settings_collection,
+    plan_features_collection,
+    catalog_snapshots_collection
+)
+
+logger = logging.getLogger(__name__)
+
+PLANS_SNAPSHOT_ID = "plans"
+
+
+async def ensure_catalog_indexes():
+    """Create the indexes backing the plan feature dictionary"""
+    await plan_features_collection.create_index("id", unique=True)
+    await plan_features_collection.create_index("label", unique=True)
+    await catalog_snapshots_collection.create_index("id", unique=True)
+
+
+async def resolve_feature_ids(labels: List[str]) -> List[str]:
+    """Map feature labels to dictionary ids, creating missing entries"""
+    ids_by_label: Dict[str, str] = {}
+    pending = list(dict.fromkeys(labels))
+    # A concurrent request may create the same label first; the unique label
+    # index rejects our copy and the next pass reads theirs
+    while pending:
+        existing = await plan_features_collection.find(
+            {"label": {"$in": pending}}, {"_id": 0, "id": 1, "label": 1}
+        ).to_list(None)
+        ids_by_label.update({feature["label"]: feature["id"] for feature in existing})
+
+        new_features = [PlanFeature(label=label) for label in pending if label not in ids_by_label]
+        if not new_features:
+            break
+        failed = await insert_many_skipping_duplicates(
+            plan_features_collection, [feature.model_dump() for feature in new_features]
+        )
+        ids_by_label.update({
+            feature.label: feature.id for index, feature in enumerate(new_features) if index not in failed
+        })
+        pending = [new_features[index].label for index in sorted(failed)]
+
+    return [ids_by_label[label] for label in labels]
+
+
+async def _load_feature_labels() -> Dict[str, str]:
+    features = await plan_features_collection.find(
+        {}, {"_id": 0, "id": 1, "label": 1}
+    ).to_list(None)
+    return {feature["id"]: feature["label"] for feature in features}
+
+
+# Every write to plans or plan features bumps the snapshot document's
+# generation; a rebuild only stores its result if the generation it started
+# from is still current, so a rebuild that read older data can never
+# overwrite a newer one, and readers rebuild when the snapshot lags.
+async def _bump_plans_generation():
+    await catalog_snapshots_collection.update_one(
+        {"id": PLANS_SNAPSHOT_ID}, {"$inc": {"generation": 1}}, upsert=True
+    )
+
+
+async def rebuild_plans_snapshot() -> List[dict]:
+    """Materialize the denormalized plans catalog read by GET /api/plans"""
+    state = await catalog_snapshots_collection.find_one_and_update(
+        {"id": PLANS_SNAPSHOT_ID},
+        {"$setOnInsert": {"generation": 0}},
+        projection={"_id": 0, "generation": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    generation = state["generation"]
+    labels = await _load_feature_labels()
+    plans = await subscription_plans_collection.find({}, {"_id": 0}).to_list(1000)
+
+    snapshot = []
+    for plan in plans:
+        feature_ids = plan.pop("feature_ids", [])
+        plan["features"] = [labels[fid] for fid in feature_ids if fid in labels]
+        snapshot.append(SubscriptionPlan(**plan).model_dump())
+
+    result = await catalog_snapshots_collection.update_one(
+        {"id": PLANS_SNAPSHOT_ID, "generation": generation},
+        {"$set": {"plans": snapshot, "built_generation": generation, "updated_at": datetime.utcnow()}}
+    )
+    if result.matched_count:
+        logger.info("Plans catalog snapshot rebuilt (%s plans)", len(snapshot))
+    else:
+        logger.info("Plans changed while rebuilding the catalog snapshot; newer rebuild wins")
+    return snapshot
+
+
+async def plans_changed() -> List[dict]:
+    """Record a plan or plan feature write and rebuild the plans snapshot"""
+    await _bump_plans_generation()
+    return await rebuild_plans_snapshot()
+
+
+async def get_plans_snapshot() -> List[dict]:
+    """Return the denormalized plans catalog, rebuilding it if absent or stale"""
+    snapshot = await catalog_snapshots_collection.find_one({"id": PLANS_SNAPSHOT_ID})
+    if snapshot is None or "plans" not in snapshot or snapshot.get("built_generation") != snapshot["generation"]:
+        return await rebuild_plans_snapshot()
+    return snapshot["plans"]
+
+
+async def migrate_legacy_plan_features():
+    """Move inline feature strings on older plan documents into the dictionary"""
+    legacy_plans = await subscription_plans_collection.find(
+        {"features": {"$exists": True}}
+    ).to_list(1000)
+    for plan in legacy_plans:
+        feature_ids = await resolve_feature_ids(plan["features"])
+        await subscription_plans_collection.update_one(
+            {"id": plan["id"]},
+            {"$set": {"feature_ids": feature_ids}, "$unset": {"features": ""}}
+        )
+    if legacy_plans:
+        await _bump_plans_generation()
+        logger.info("Migrated %s plans to the feature dictionary", len(legacy_plans))
+
+
+async def rename_plan_feature(feature_id: str, label: str):
+    """Rename a feature once and refresh the plans snapshot.
+
+    Raises DuplicateKeyError if another feature already has the label.
+    """
+    feature = await plan_features_collection.find_one_and_update(
+        {"id": feature_id},
+        {"$set": {"label": label, "updated_at": datetime.utcnow()}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if feature is not None:
+        await plans_changed()
+    return feature
+
+
+async def fetch_active_features() -> List[dict]:
+    """Active features in display order, as read by GET /api/features"""
+    return await features_collection.find({"active": True}, {"_id": 0}).sort("order", 1).to_list(1000)
+
+
+async def fetch_app_settings():
+    """Main application settings document, as read by GET /api/settings"""
+    settings = await app_settings_collection.find_one({"id": "app_settings_main"})
+    # Convert ObjectId to string to make it JSON serializable
+    if settings and "_id" in settings:
+        settings["_id"] = str(settings["_id"])
+    return settings
@@ -0,0 +1,141 @@
+"""Command line tools for the StreamMax Pro backend.
+
+    python cli.py snapshot --output ./static_catalog
+    python cli.py report --period 2026-09
+    python cli.py backfill-emails
+    python cli.py drop-contact-partitions --before 2026-01
+    python cli.py profile-startup --top 20
+"""
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from log_config import configure_logging
+
+cli = typer.Typer(help="StreamMax Pro backend tools")
+
+
+@cli.callback()
+def setup():
+    configure_logging()
+
+
+@cli.command()
+def snapshot(
+    output: Optional[str] = typer.Option(os.environ.get('CATALOG_SNAPSHOT_DIR'), help="Directory to write snapshot files into"),
+    compress: bool = typer.Option(True, help="Also write precompressed .gz files")
+):
+    """Render plans, features and settings into hashed JSON files for CDN serving"""
+    from static_catalog import render_catalog, write_snapshot_files
+
+    if not output:
+        raise typer.BadParameter("Set --output or CATALOG_SNAPSHOT_DIR")
+
+    async def run():
+        bodies = await render_catalog()
+        return write_snapshot_files(Path(output), bodies, compress=compress)
+
+    manifest = asyncio.run(run())
+    for name, entry in manifest["files"].items():
+        typer.echo(f"{name}: {entry['file']} ({entry['size']} bytes)")
+
+
+@cli.command()
+def report(
+    period: List[str] = typer.Option(..., help="Period(s) to report, as YYYY-MM"),
+    refresh: bool = typer.Option(False, help="Recompute even if a cached report exists")
+):
+    """Print per-reseller sales, revenue, discount and commission"""
+    import pandas as pd
+    from reporting import get_report
+
+    async def run():
+        return {p: await get_report(p, refresh=refresh) for p in period}
+
+    for p, rows in asyncio.run(run()).items():
+        typer.echo(f"== {p} ==")
+        frame = pd.DataFrame(rows, columns=["reseller_id", "name", "sales", "revenue", "discount", "commission"])
+        typer.echo(frame.to_string(index=False) if rows else "no sales")
+
+
+@cli.command("backfill-emails")
+def backfill_emails():
+    """Canonicalize emails and add hashed lookup keys to older documents"""
+    from identity import backfill_email_keys
+
+    updated = asyncio.run(backfill_email_keys())
+    typer.echo(f"Backfilled {updated} documents")
+
+
+@cli.command("drop-contact-partitions")
+def drop_contact_partitions(
+    before: str = typer.Option(..., help="Drop every month before this one, as YYYY-MM"),
+    yes: bool = typer.Option(False, "--yes", help="Do not ask for confirmation")
+):
+    """Permanently drop monthly contact message partitions"""
+    from contact_partitions import drop_partitions_before, partitions_between
+
+    try:
+        cutoff = datetime.strptime(before, "%Y-%m")
+    except ValueError:
+        raise typer.BadParameter("Use YYYY-MM", param_hint="--before")
+
+    async def run():
+        doomed = await partitions_between(end=cutoff)
+        if doomed and not yes:
+            typer.confirm(f"Drop {', '.join(doomed)}?", abort=True)
+        return await drop_partitions_before(cutoff) if doomed else []
+
+    dropped = asyncio.run(run())
+    for name in dropped:
+        typer.echo(f"Dropped {name}")
+    if not dropped:
+        typer.echo("No partitions to drop")
+
+
+@cli.command("profile-startup")
+def profile_startup(
+    top: int = typer.Option(15, help="Slowest modules to list"),
+    first_request: bool = typer.Option(True, help="Also measure time to first request"),
+    as_json: bool = typer.Option(False, "--json", help="Print a machine-readable report"),
+    max_import_ms: Optional[float] = typer.Option(None, help="Exit non-zero if importing server takes longer")
+):
+    """Report per-module import cost and time to first request"""
+    from startup_profile import profile_imports, time_to_first_request
+
+    entries = profile_imports("server")
+    server_entry = next(entry for entry in entries if entry["module"] == "server")
+    # Top-level modules only, so packages are not double counted with their submodules
+    slowest = sorted(
+        (entry for entry in entries if entry["depth"] <= 1 and entry["module"] != "server"),
+        key=lambda entry: entry["cumulative_ms"], reverse=True
+    )[:top]
+    ttfr = time_to_first_request() if first_request else None
+
+    if as_json:
+        typer.echo(json.dumps({
+            "server_import_ms": server_entry["cumulative_ms"],
+            "time_to_first_request_ms": round(ttfr * 1000, 1) if ttfr is not None else None,
+            "modules": slowest
+        }, indent=2))
+    else:
+        typer.echo(f"import server: {server_entry['cumulative_ms']:.1f}ms")
+        for entry in slowest:
+            typer.echo(f"  {entry['cumulative_ms']:9.1f}ms  {entry['module']}")
+        if first_request:
+            typer.echo(f"time to first request: {ttfr * 1000:.0f}ms" if ttfr is not None else "server did not start")
+
+    if max_import_ms is not None and server_entry["cumulative_ms"] > max_import_ms:
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    cli()
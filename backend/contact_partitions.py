@@ -0,0 +1,181 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from database import db, contact_messages_collection, insert_many_skipping_duplicates
+
+logger = logging.getLogger(__name__)
+
+# Contact messages are stored in one collection per calendar month (UTC) of
+# created_at, e.g. contact_messages_2026_10. Range queries only touch the
+# months they overlap and a whole month is retired by dropping its collection.
+PARTITION_PREFIX = "contact_messages_"
+PARTITION_PATTERN = re.compile(r"^contact_messages_(\d{4})_(\d{2})$")
+
+CONTACT_PARTITION_RETENTION_MONTHS = int(os.environ.get('CONTACT_PARTITION_RETENTION_MONTHS', '0'))
+CONTACT_MIGRATION_BATCH_SIZE = int(os.environ.get('CONTACT_MIGRATION_BATCH_SIZE', '500'))
+
+# Partitions whose indexes were already created by this process
+_indexed_partitions = set()
+
+
+def naive_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    """Stored timestamps are naive UTC; convert timezone-aware inputs to match"""
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(created_at: datetime) -> str:
+    """Name of the collection holding messages created at the given time"""
+    return f"{PARTITION_PREFIX}{created_at.year:04d}_{created_at.month:02d}"
+
+
+def partition_month(name: str) -> Optional[datetime]:
+    """First instant of the month a partition covers, or None for other collections"""
+    match = PARTITION_PATTERN.match(name)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+
+async def ensure_partition_indexes(name: str):
+    """Create the range, status and import-key indexes on a partition once per process"""
+    if name in _indexed_partitions:
+        return
+    collection = db[name]
+    await collection.create_index("id", unique=True)
+    await collection.create_index([("created_at", -1)])
+    await collection.create_index([("status", 1), ("created_at", -1)])
+    # Bulk imports upsert on (email, imported); unique so concurrent imports cannot duplicate
+    await collection.create_index(
+        [("email", 1), ("imported", 1)],
+        unique=True,
+        partialFilterExpression={"imported": True}
+    )
+    _indexed_partitions.add(name)
+
+
+async def partition_for(created_at: datetime):
+    """Collection a message created at the given time is written to"""
+    name = partition_name(created_at)
+    await ensure_partition_indexes(name)
+    return db[name]
+
+
+async def insert_contact_message(document: dict):
+    """Insert a message into its month's partition"""
+    collection = await partition_for(document["created_at"])
+    await collection.insert_one(document)
+
+
+async def list_partitions() -> List[str]:
+    """Existing partition collection names, oldest month first"""
+    names = await db.list_collection_names()
+    return sorted(name for name in names if PARTITION_PATTERN.match(name))
+
+
+async def partitions_between(start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[str]:
+    """Existing partitions that can hold messages created in [start, end)"""
+    start, end = naive_utc(start), naive_utc(end)
+    selected = []
+    for name in await list_partitions():
+        month = partition_month(name)
+        if start is not None and add_months(month, 1) <= start:
+            continue
+        if end is not None and month >= end:
+            continue
+        selected.append(name)
+    return selected
+
+
+async def _find_in_partition(name: str, query: dict, limit: int) -> List[dict]:
+    return await db[name].find(query, {"_id": 0}).sort("created_at", -1).to_list(limit)
+
+
+async def find_contact_messages(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: Optional[str] = None,
+    limit: int = 100
+) -> List[dict]:
+    """Messages created in [start, end), newest first, reading only the overlapping partitions"""
+    start, end = naive_utc(start), naive_utc(end)
+    query: Dict[str, object] = {}
+    created_at = {}
+    if start is not None:
+        created_at["$gte"] = start
+    if end is not None:
+        created_at["$lt"] = end
+    if created_at:
+        query["created_at"] = created_at
+    if status:
+        query["status"] = status
+
+    names = await partitions_between(start, end)
+    results = await asyncio.gather(*(_find_in_partition(name, query, limit) for name in names))
+    merged = heapq.merge(*results, key=lambda document: document["created_at"], reverse=True)
+    return list(itertools.islice(merged, limit))
+
+
+async def drop_partitions_before(cutoff: datetime) -> List[str]:
+    """Drop every partition whose whole month ends on or before the cutoff"""
+    cutoff = naive_utc(cutoff)
+    dropped = []
+    for name in await list_partitions():
+        if add_months(partition_month(name), 1) <= cutoff:
+            await db.drop_collection(name)
+            _indexed_partitions.discard(name)
+            dropped.append(name)
+    if dropped:
+        logger.info("Dropped contact message partitions: %s", ", ".join(dropped))
+    return dropped
+
+
+async def drop_expired_partitions(now: Optional[datetime] = None) -> List[str]:
+    """Drop partitions older than the configured retention, if one is set"""
+    if CONTACT_PARTITION_RETENTION_MONTHS <= 0:
+        return []
+    now = now or datetime.utcnow()
+    return await drop_partitions_before(add_months(month_start(now), -CONTACT_PARTITION_RETENTION_MONTHS))
+
+
+async def migrate_legacy_contact_messages() -> int:
+    """Move messages from the single pre-partitioning collection into partitions"""
+    moved = 0
+    while True:
+        documents = await contact_messages_collection.find().limit(
+            CONTACT_MIGRATION_BATCH_SIZE
+        ).to_list(CONTACT_MIGRATION_BATCH_SIZE)
+        if not documents:
+            break
+
+        batches: Dict[str, List[dict]] = {}
+        for document in documents:
+            batches.setdefault(partition_name(document["created_at"]), []).append(document)
+        for name, batch in batches.items():
+            await ensure_partition_indexes(name)
+            # Documents copied by an interrupted earlier run are already in place
+            await insert_many_skipping_duplicates(db[name], batch)
+
+        await contact_messages_collection.delete_many(
+            {"_id": {"$in": [document["_id"] for document in documents]}}
+        )
+        moved += len(documents)
+    if moved:
+        logger.info("Moved %s contact messages into monthly partitions", moved)
+    return moved
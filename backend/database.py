@@ -2,6 +2,9 @@ import os
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 import logging
+from typing import List, Set
+
+from pymongo.errors import BulkWriteError
 
 # Load environment variables
 load_dotenv()
@@ -10,27 +13,118 @@ load_dotenv()
 mongo_url = os.environ.get('MONGO_URL')
 db_name = os.environ.get('DB_NAME', 'streammax_db')
 
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+
+# The Motor client is created on first use in each process, so the app can be
+# imported (and forked by the multi-worker launcher) before any connection exists.
+_client = None
+_client_pid = None
+
+
+def get_client() -> AsyncIOMotorClient:
+    """Return this process's Motor client, creating it after a fork if needed"""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        _client = AsyncIOMotorClient(
+            mongo_url,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS
+        )
+        _client_pid = os.getpid()
+    return _client
+
+
+class _LazyDatabase:
+    """Module-level stand-in for the database, resolved per process"""
+
+    def __getattr__(self, name):
+        return getattr(get_client()[db_name], name)
+
+    def __getitem__(self, name):
+        return get_client()[db_name][name]
+
+
+class _LazyCollection:
+    """Module-level stand-in for a collection, resolved per process"""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_client()[db_name][self._name], attr)
+
+
+db = _LazyDatabase()
 
 # Collections
-subscription_plans_collection = db.subscription_plans
-features_collection = db.features
-trial_signups_collection = db.trial_signups
-reseller_applications_collection = db.reseller_applications
-contact_messages_collection = db.contact_messages
-app_settings_collection = db.app_settings
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+subscription_plans_collection = _LazyCollection("subscription_plans")
+features_collection = _LazyCollection("features")
+trial_signups_collection = _LazyCollection("trial_signups")
+reseller_applications_collection = _LazyCollection("reseller_applications")
+contact_messages_collection = _LazyCollection("contact_messages")
+app_settings_collection = _LazyCollection("app_settings")
+plan_features_collection = _LazyCollection("plan_features")
+catalog_snapshots_collection = _LazyCollection("catalog_snapshots")
+contact_messages_archive_collection = _LazyCollection("contact_messages_archive")
+trial_signups_archive_collection = _LazyCollection("trial_signups_archive")
+reseller_sales_collection = _LazyCollection("reseller_sales")
+reseller_reports_collection = _LazyCollection("reseller_reports")
+
 logger = logging.getLogger(__name__)
 
+DUPLICATE_KEY_ERROR = 11000
+
+
+async def insert_many_skipping_duplicates(collection, documents: List[dict]) -> Set[int]:
+    """Insert documents unordered and return the indices rejected as duplicate keys
+
+    Any other write error is re-raised.
+    """
+    try:
+        await collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != DUPLICATE_KEY_ERROR for error in errors):
+            raise
+        return {error["index"] for error in errors}
+    return set()
+
+
 async def init_default_data():
     """Initialize the database with default data"""
     try:
+        # Check if the plan feature dictionary exists
+        plan_features_count = await plan_features_collection.count_documents({})
+        if plan_features_count == 0:
+            # Insert default plan features, referenced by id from the plans
+            default_plan_features = [
+                {"id": "pf_live_channels", "label": "25,000+ Live Channels"},
+                {"id": "pf_vod_titles", "label": "100,000+ VOD Titles"},
+                {"id": "pf_4k_quality", "label": "4K Ultra HD Quality"},
+                {"id": "pf_multi_device", "label": "Multi-Device Access"},
+                {"id": "pf_support", "label": "24/7 Customer Support"},
+                {"id": "pf_instant_activation", "label": "Instant Activation"},
+                {"id": "pf_epg", "label": "EPG Included"},
+                {"id": "pf_uptime", "label": "99.9% Uptime Guarantee"},
+                {"id": "pf_priority_support", "label": "Priority Support"},
+                {"id": "pf_exclusive_content", "label": "Exclusive Content"},
+                {"id": "pf_sports_package", "label": "Premium Sports Package"}
+            ]
+            await plan_features_collection.insert_many(default_plan_features)
+            logger.info("Default plan features inserted")
+
         # Check if subscription plans exist
         plans_count = await subscription_plans_collection.count_documents({})
         if plans_count == 0:
+            base_feature_ids = [
+                "pf_live_channels",
+                "pf_vod_titles",
+                "pf_4k_quality",
+                "pf_multi_device",
+                "pf_support",
+                "pf_instant_activation",
+                "pf_epg",
+                "pf_uptime"
+            ]
             # Insert default subscription plans
             default_plans = [
                 {
@@ -39,16 +133,7 @@ async def init_default_data():
                     "price": 12.0,
                     "original_price": 15.0,
                     "popular": False,
-                    "features": [
-                        "25,000+ Live Channels",
-                        "100,000+ VOD Titles",
-                        "4K Ultra HD Quality",
-                        "Multi-Device Access",
-                        "24/7 Customer Support",
-                        "Instant Activation",
-                        "EPG Included",
-                        "99.9% Uptime Guarantee"
-                    ],
+                    "feature_ids": base_feature_ids,
                     "color": "from-blue-500 to-blue-600",
                     "button_text": "Get Started"
                 },
@@ -58,17 +143,7 @@ async def init_default_data():
                     "price": 25.0,
                     "original_price": 45.0,
                     "popular": True,
-                    "features": [
-                        "25,000+ Live Channels",
-                        "100,000+ VOD Titles",
-                        "4K Ultra HD Quality",
-                        "Multi-Device Access",
-                        "24/7 Customer Support",
-                        "Instant Activation",
-                        "EPG Included",
-                        "99.9% Uptime Guarantee",
-                        "Priority Support"
-                    ],
+                    "feature_ids": base_feature_ids + ["pf_priority_support"],
                     "color": "from-purple-500 to-pink-600",
                     "button_text": "Most Popular"
                 },
@@ -78,17 +153,9 @@ async def init_default_data():
                     "price": 45.0,
                     "original_price": 90.0,
                     "popular": False,
-                    "features": [
-                        "25,000+ Live Channels",
-                        "100,000+ VOD Titles",
-                        "4K Ultra HD Quality",
-                        "Multi-Device Access",
-                        "24/7 Customer Support",
-                        "Instant Activation",
-                        "EPG Included",
-                        "99.9% Uptime Guarantee",
-                        "Priority Support",
-                        "Exclusive Content"
+                    "feature_ids": base_feature_ids + [
+                        "pf_priority_support",
+                        "pf_exclusive_content"
                     ],
                     "color": "from-green-500 to-teal-600",
                     "button_text": "Best Value"
@@ -99,18 +166,10 @@ async def init_default_data():
                     "price": 79.0,
                     "original_price": 180.0,
                     "popular": False,
-                    "features": [
-                        "25,000+ Live Channels",
-                        "100,000+ VOD Titles",
-                        "4K Ultra HD Quality",
-                        "Multi-Device Access",
-                        "24/7 Customer Support",
-                        "Instant Activation",
-                        "EPG Included",
-                        "99.9% Uptime Guarantee",
-                        "Priority Support",
-                        "Exclusive Content",
-                        "Premium Sports Package"
+                    "feature_ids": base_feature_ids + [
+                        "pf_priority_support",
+                        "pf_exclusive_content",
+                        "pf_sports_package"
                     ],
                     "color": "from-orange-500 to-red-600",
                     "button_text": "Ultimate Deal"
@@ -217,9 +276,12 @@ async def init_default_data():
         logger.info("Database initialization completed successfully")
 
     except Exception as e:
-        logger.error(f"Error initializing database: {e}")
+        logger.error("Error initializing database: %s", e)
         raise
 
 async def close_db_connection():
     """Close database connection"""
-    client.close()
\ No newline at end of file
+    global _client
+    if _client is not None and _client_pid == os.getpid():
+        _client.close()
+    _client = None
\ No newline at end of file
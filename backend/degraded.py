@@ -0,0 +1,287 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from bson import json_util
+from pymongo.errors import (
+    ConnectionFailure, ExecutionTimeout, NetworkTimeout, PyMongoError, ServerSelectionTimeoutError
+)
+
+from database import db
+from models import JSON_ADAPTER
+from static_catalog import write_atomic
+
+logger = logging.getLogger(__name__)
+
+BREAKER_WINDOW = int(os.environ.get('DB_BREAKER_WINDOW', '20'))
+BREAKER_MIN_CALLS = int(os.environ.get('DB_BREAKER_MIN_CALLS', '5'))
+BREAKER_ERROR_RATE = float(os.environ.get('DB_BREAKER_ERROR_RATE', '0.5'))
+BREAKER_RESET_SECONDS = float(os.environ.get('DB_BREAKER_RESET_SECONDS', '15'))
+LAST_KNOWN_GOOD_DIR = os.environ.get('LAST_KNOWN_GOOD_DIR')
+WRITE_SPOOL_PATH = os.environ.get('WRITE_SPOOL_PATH')
+
+# Errors that mean the database is unreachable or overloaded. Everything else
+# the driver raises (duplicate keys, failed commands) is an answer from a
+# healthy server, usually caused by the request, and must not trip the circuit.
+# AutoReconnect is a ConnectionFailure subclass.
+OUTAGE_ERRORS = (
+    ConnectionFailure,
+    ServerSelectionTimeoutError,
+    NetworkTimeout,
+    ExecutionTimeout,
+    asyncio.TimeoutError
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the database while the circuit is open"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Database circuit is open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Fail fast once the recent database error rate crosses a threshold.
+
+    Used as an async context manager around database calls. Connectivity
+    errors and timeouts inside the block count as failures; once the error rate
+    over the last `window` calls reaches `error_rate`, the circuit opens and
+    callers get CircuitOpenError immediately. After `reset_seconds` one
+    trial call is let through; its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window: int = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 error_rate: float = BREAKER_ERROR_RATE, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self._outcomes = deque(maxlen=window)
+        self._trial_in_flight = False
+        self.stats = {"rejected": 0, "failures": 0, "opened": 0}
+
+    def _retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def before_call(self):
+        if self.state == self.OPEN:
+            if self._retry_after() > 0:
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(self._retry_after())
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(self.reset_seconds)
+            self._trial_in_flight = True
+
+    def record(self, success: bool):
+        if self.state == self.HALF_OPEN:
+            self._trial_in_flight = False
+            if success:
+                logger.info("Database circuit closed")
+                self.state = self.CLOSED
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+
+        self._outcomes.append(success)
+        if not success:
+            self.stats["failures"] += 1
+        failures = self._outcomes.count(False)
+        if (self.state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.error_rate):
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.stats["opened"] += 1
+        logger.warning("Database circuit opened for %ss", self.reset_seconds)
+
+    @property
+    def is_closed(self) -> bool:
+        return self.state == self.CLOSED
+
+    async def __aenter__(self):
+        self.before_call()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.record(True)
+        elif issubclass(exc_type, OUTAGE_ERRORS):
+            self.record(False)
+        elif issubclass(exc_type, PyMongoError):
+            # The server answered, so as far as the circuit is concerned the call succeeded
+            self.record(True)
+        elif self.state == self.HALF_OPEN:
+            # Non-database errors say nothing about the database; free the trial slot
+            self._trial_in_flight = False
+        return False
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "state": self.state, "retry_after": round(self._retry_after(), 1)}
+
+
+class LastKnownGood:
+    """Last successfully read catalog documents, in memory and optionally on disk"""
+
+    def __init__(self, directory: Optional[str] = LAST_KNOWN_GOOD_DIR):
+        self.directory = Path(directory) if directory else None
+        self._values: Dict[str, Any] = {}
+        self._write_lock = asyncio.Lock()
+
+    async def remember(self, key: str, value: Any):
+        if value is None:
+            return
+        previous = self._values.get(key)
+        if previous is value or previous == value:
+            return
+        self._values[key] = value
+        if self.directory is None:
+            return
+        # Encoding and the file write stay off the event loop; the lock keeps
+        # an older value from overwriting a newer one on disk
+        async with self._write_lock:
+            try:
+                await asyncio.to_thread(self._persist, key, value)
+            except OSError as e:
+                logger.warning("Could not save last known good %s: %s", key, e)
+
+    def _persist(self, key: str, value: Any):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.directory / f"{key}.json", JSON_ADAPTER.dump_json(value))
+
+    def get(self, key: str) -> Optional[Any]:
+        if key not in self._values and self.directory is not None:
+            path = self.directory / f"{key}.json"
+            if path.exists():
+                self._values[key] = json.loads(path.read_text())
+        return self._values.get(key)
+
+
+class WriteSpool:
+    """Append-only file of inserts deferred while the database is unavailable.
+
+    Each line holds a collection name, an identity filter and the document;
+    replay applies them as `$setOnInsert` upserts, so replaying the same line
+    twice is harmless. Every worker under the launcher appends to the same
+    file, so appends and the hand-over to replay hold an exclusive flock on
+    a sidecar lock file: replay renames the spool aside under the lock and
+    applies it without blocking writers.
+    """
+
+    def __init__(self, path: Optional[str] = WRITE_SPOOL_PATH):
+        self.path = Path(path) if path else None
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    @property
+    def _replaying_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".replaying")
+
+    @contextmanager
+    def _file_lock(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _append(self, text: str):
+        with self._file_lock():
+            with open(self.path, "a", encoding="utf-8") as spool_file:
+                spool_file.write(text)
+                spool_file.flush()
+                os.fsync(spool_file.fileno())
+
+    def _claim(self) -> Optional[List[str]]:
+        """Take the pending lines for replay, including any left by an interrupted replay"""
+        with self._file_lock():
+            replaying = self._replaying_path
+            if not replaying.exists():
+                if not self.path.exists():
+                    return None
+                os.replace(self.path, replaying)
+            return replaying.read_text("utf-8").splitlines()
+
+    def _finish(self, remaining: List[str]):
+        # Lines that failed to apply go back on the spool for the next replay
+        if remaining:
+            self._append("\n".join(remaining) + "\n")
+        self._replaying_path.unlink(missing_ok=True)
+
+    async def spool(self, collection: str, filter: dict, document: dict):
+        entry = {"collection": collection, "filter": filter, "document": document,
+                 "spooled_at": datetime.utcnow()}
+        async with self._lock:
+            await asyncio.to_thread(self._append, json_util.dumps(entry) + "\n")
+
+    async def replay(self) -> int:
+        """Apply spooled writes to the database and truncate the spool"""
+        if not self.enabled:
+            return 0
+        async with self._lock:
+            lines = await asyncio.to_thread(self._claim)
+            if lines is None:
+                return 0
+            replayed = 0
+            try:
+                for line in lines:
+                    if not line.strip():
+                        replayed += 1
+                        continue
+                    entry = json_util.loads(line)
+                    await db[entry["collection"]].update_one(
+                        entry["filter"], {"$setOnInsert": entry["document"]}, upsert=True
+                    )
+                    replayed += 1
+            finally:
+                await asyncio.to_thread(self._finish, lines[replayed:])
+        if replayed:
+            logger.info("Replayed %s spooled writes", replayed)
+        return replayed
+
+
+db_breaker = CircuitBreaker()
+last_known_good = LastKnownGood()
+write_spool = WriteSpool()
+
+SPOOL_REPLAY_INTERVAL_SECONDS = int(os.environ.get('SPOOL_REPLAY_INTERVAL_SECONDS', '30'))
+
+
+async def spool_replay_loop():
+    """Periodically replay spooled writes while the circuit is closed"""
+    while True:
+        await asyncio.sleep(SPOOL_REPLAY_INTERVAL_SECONDS)
+        if not db_breaker.is_closed:
+            continue
+        try:
+            async with db_breaker:
+                await write_spool.replay()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error replaying write spool: %s", e)
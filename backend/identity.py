@@ -0,0 +1,90 @@
+import hashlib
+import logging
+import os
+from typing import Dict
+
+from pymongo import UpdateOne
+
+from database import (
+    trial_signups_collection,
+    reseller_applications_collection
+)
+
+logger = logging.getLogger(__name__)
+
+EMAIL_KEY_BATCH_SIZE = int(os.environ.get('EMAIL_KEY_BATCH_SIZE', '1000'))
+
+# Collections whose documents are identified by email
+IDENTITY_COLLECTIONS = [
+    trial_signups_collection,
+    reseller_applications_collection
+]
+
+
+def canonical_email(email: str) -> str:
+    """Normalize an email address so case and whitespace variants match"""
+    return email.strip().lower()
+
+
+def email_key(email: str) -> bytes:
+    """Compact fixed-length (16 byte) lookup key for an email address"""
+    return hashlib.blake2b(canonical_email(email).encode("utf-8"), digest_size=16).digest()
+
+
+def identity_fields(email: str) -> Dict[str, object]:
+    """Fields stored on every email-identified document"""
+    return {"email": canonical_email(email), "email_key": email_key(email)}
+
+
+async def ensure_identity_indexes():
+    """Create the unique hashed email index on identity collections"""
+    for collection in IDENTITY_COLLECTIONS:
+        await collection.create_index(
+            "email_key",
+            unique=True,
+            partialFilterExpression={"email_key": {"$exists": True}}
+        )
+
+
+async def _backfill_collection(collection) -> int:
+    updated = 0
+    pending = {"email_key": {"$exists": False}, "duplicate_of": {"$exists": False}}
+    while True:
+        documents = await collection.find(
+            pending, {"_id": 1, "id": 1, "email": 1}
+        ).sort("created_at", 1).limit(EMAIL_KEY_BATCH_SIZE).to_list(EMAIL_KEY_BATCH_SIZE)
+        if not documents:
+            break
+
+        keys = {document["_id"]: email_key(document["email"]) for document in documents}
+        existing = await collection.find(
+            {"email_key": {"$in": list(set(keys.values()))}}, {"id": 1, "email_key": 1}
+        ).to_list(None)
+        owners = {document["email_key"]: document["id"] for document in existing}
+
+        operations = []
+        for document in documents:
+            key = keys[document["_id"]]
+            if key in owners:
+                # Oldest document keeps the identity; later case variants are flagged
+                update = {"duplicate_of": owners[key]}
+            else:
+                owners[key] = document["id"]
+                update = identity_fields(document["email"])
+            operations.append(UpdateOne({"_id": document["_id"]}, {"$set": update}))
+
+        await collection.bulk_write(operations, ordered=False)
+        updated += len(operations)
+    return updated
+
+
+async def backfill_email_keys() -> int:
+    """Canonicalize emails and add hashed keys to documents missing them"""
+    total = 0
+    for collection in IDENTITY_COLLECTIONS:
+        updated = await _backfill_collection(collection)
+        if updated:
+            logger.info("Backfilled email keys on %s %s documents", updated, collection.name)
+        total += updated
+    return total
+
@@ -0,0 +1,112 @@
+"""Production entry point running the API in several worker processes.
+
+The app is imported once in the parent and inherited by forked workers.
+The Motor client is created lazily in each worker (see database.get_client),
+so no connection or driver thread crosses a fork. Worker 0 is the leader: it
+runs the startup migrations and keeps the shared memory catalog fresh, which
+every worker serves for /api/plans, /api/features and /api/settings.
+
+    python launcher.py --workers 4 --port 8001
+"""
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import typer
+import uvicorn
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import shared_catalog
+from shared_catalog import SharedCatalog
+from log_config import configure_logging, stop_logging
+
+logger = logging.getLogger("launcher")
+
+
+def _bind(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(index: int, app, sock: socket.socket, catalog: SharedCatalog):
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    shared_catalog.attach(catalog, leader=index == 0)
+    config = uvicorn.Config(app, log_config=None, access_log=False, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(index: int, app, sock: socket.socket, catalog: SharedCatalog) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(index, app, sock, catalog)
+        except BaseException:
+            logger.exception("Worker %s crashed", index)
+            code = 1
+        finally:
+            stop_logging()
+            os._exit(code)
+    logger.info("Started worker %s (pid %s)", index, pid)
+    return pid
+
+
+def main(
+    host: str = typer.Option("0.0.0.0", help="Bind address"),
+    port: int = typer.Option(8001, help="Bind port"),
+    workers: int = typer.Option(os.cpu_count() or 1, help="Number of worker processes"),
+    backlog: int = typer.Option(2048, help="Listen backlog")
+):
+    """Serve the API from several forked workers sharing one socket"""
+    configure_logging()
+    from server import app
+
+    sock = _bind(host, port, backlog)
+    catalog = SharedCatalog.create()
+    children = {_spawn(index, app, sock, catalog): index for index in range(workers)}
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        while children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            index = children.pop(pid, None)
+            if index is None or stopping:
+                continue
+            logger.warning("Worker %s (pid %s) exited with %s; restarting", index, pid, status)
+            time.sleep(1)
+            children[_spawn(index, app, sock, catalog)] = index
+    finally:
+        sock.close()
+        catalog.close()
+        catalog.unlink()
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,197 @@
+import asyncio
+import csv
+import io
+import itertools
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from models import (
+    ResellerApplication, ContactMessage, from_create,
+    RESELLER_APPLICATION_CREATE_ADAPTER, CONTACT_MESSAGE_CREATE_ADAPTER
+)
+from identity import identity_fields, canonical_email
+from database import reseller_applications_collection
+from contact_partitions import partition_for
+from degraded import db_breaker
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', '5000'))
+IMPORT_MAX_REPORTED_ERRORS = int(os.environ.get('IMPORT_MAX_REPORTED_ERRORS', '1000'))
+
+
+def _reseller_upsert(lead: BaseModel) -> Tuple[dict, UpdateOne]:
+    identity = identity_fields(lead.email)
+    application = from_create(ResellerApplication, lead)
+    document = {**application.model_dump(), **identity}
+    # Re-importing must not wipe values a row leaves out (empty cell or missing key)
+    provided = lead.model_dump(exclude_unset=True)
+    updates = {field: document.pop(field) for field in ("name", "company", "message") if field in provided}
+    updates["updated_at"] = document.pop("updated_at")
+    key = {"email_key": identity["email_key"]}
+    return key, UpdateOne(key, {"$set": updates, "$setOnInsert": document}, upsert=True)
+
+
+def _contact_upsert(contact: BaseModel) -> Tuple[dict, UpdateOne]:
+    message = from_create(ContactMessage, contact)
+    document = message.model_dump()
+    document["email"] = canonical_email(contact.email)
+    document["imported"] = True
+    updates = {field: document.pop(field) for field in ("name", "subject", "message", "updated_at")}
+    # Imported contacts are keyed per email within the month's partition and
+    # never overwrite messages sent through the site
+    key = {"email": document["email"], "imported": True}
+    return key, UpdateOne(key, {"$set": updates, "$setOnInsert": document}, upsert=True)
+
+
+async def _reseller_collection():
+    return reseller_applications_collection
+
+
+async def _contact_collection():
+    return await partition_for(datetime.utcnow())
+
+
+class ImportTarget:
+    def __init__(
+        self,
+        adapter: TypeAdapter,
+        collection: Callable[[], Awaitable[object]],
+        build: Callable[[BaseModel], Tuple[dict, UpdateOne]]
+    ):
+        self.adapter = adapter
+        self.collection = collection
+        self.build = build
+
+
+IMPORT_TARGETS = {
+    "resellers": ImportTarget(RESELLER_APPLICATION_CREATE_ADAPTER, _reseller_collection, _reseller_upsert),
+    "contacts": ImportTarget(CONTACT_MESSAGE_CREATE_ADAPTER, _contact_collection, _contact_upsert)
+}
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    name = (filename or "").lower()
+    if name.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    return None
+
+
+def _iter_rows(binary_file, file_format: str) -> Iterator[Tuple[int, object]]:
+    """Yield (row number, raw row) pairs, reading the file incrementally"""
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            # Empty cells mean "not provided" so optional fields validate as None
+            yield reader.line_num, {key: value for key, value in row.items() if key and value != ""}
+    else:
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, e
+
+
+class ImportReport:
+    def __init__(self, file_format: str):
+        self.file_format = file_format
+        self.rows = 0
+        self.invalid = 0
+        self.upserted = 0
+        self.modified = 0
+        self.matched = 0
+        self.errors: List[dict] = []
+        self.started = time.perf_counter()
+
+    def error(self, row: int, errors):
+        self.invalid += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "errors": errors})
+
+    def as_dict(self) -> dict:
+        duration = time.perf_counter() - self.started
+        return {
+            "format": self.file_format,
+            "rows": self.rows,
+            "valid": self.rows - self.invalid,
+            "invalid": self.invalid,
+            "upserted": self.upserted,
+            "modified": self.modified,
+            "matched": self.matched,
+            "errors": self.errors,
+            "errors_truncated": self.invalid > len(self.errors),
+            "duration_seconds": round(duration, 3),
+            "rows_per_second": round(self.rows / duration) if duration else 0
+        }
+
+
+async def _write_chunk(target: ImportTarget, operations: dict, report: ImportReport):
+    rows = list(operations)
+    requests = [operations[row] for row in rows]
+    try:
+        async with db_breaker:
+            collection = await target.collection()
+            result = await collection.bulk_write(requests, ordered=False)
+        details = result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        for write_error in details.get("writeErrors", []):
+            report.error(rows[write_error["index"]], [{"msg": write_error.get("errmsg")}])
+    report.upserted += details.get("nUpserted", 0)
+    report.modified += details.get("nModified", 0)
+    report.matched += details.get("nMatched", 0)
+
+
+async def import_leads(kind: str, binary_file, file_format: str) -> dict:
+    """Validate and upsert an uploaded CSV/NDJSON file in chunks"""
+    target = IMPORT_TARGETS[kind]
+    report = ImportReport(file_format)
+    rows = _iter_rows(binary_file, file_format)
+
+    while True:
+        # File reading and parsing run off the event loop, one chunk at a time
+        chunk = await asyncio.to_thread(lambda: list(itertools.islice(rows, IMPORT_CHUNK_SIZE)))
+        if not chunk:
+            break
+
+        operations = {}
+        keys = {}
+        for row_number, raw in chunk:
+            report.rows += 1
+            if isinstance(raw, Exception):
+                report.error(row_number, [{"msg": str(raw)}])
+                continue
+            try:
+                key, operation = target.build(target.adapter.validate_python(raw))
+            except ValidationError as e:
+                report.error(row_number, e.errors(include_url=False, include_context=False))
+                continue
+            # Later rows for the same email win within a chunk
+            previous = keys.pop(repr(key), None)
+            if previous is not None:
+                del operations[previous]
+            keys[repr(key)] = row_number
+            operations[row_number] = operation
+
+        if operations:
+            await _write_chunk(target, operations, report)
+
+    summary = report.as_dict()
+    logger.info(
+        "Imported %s %s rows (%s invalid) at %s rows/s",
+        summary["rows"], kind, summary["invalid"], summary["rows_per_second"]
+    )
+    return summary
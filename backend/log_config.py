@@ -0,0 +1,106 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+ACCESS_LOG_SAMPLE_RATE = float(os.environ.get('ACCESS_LOG_SAMPLE_RATE', '1.0'))
+ACCESS_LOG_SLOW_MS = float(os.environ.get('ACCESS_LOG_SLOW_MS', '1000'))
+
+# Per-request fields (request_id, method, route) attached to every log line
+request_context: ContextVar[dict] = ContextVar('request_context', default={})
+
+access_logger = logging.getLogger('access')
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'request_context'}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Render log records as single-line JSON objects"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        payload.update(getattr(record, 'request_context', {}))
+        payload.update(
+            (key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRS
+        )
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue records without formatting them on the calling thread.
+
+    The stock QueueHandler renders the message before enqueueing so records
+    can be pickled; the listener here is in-process, so interpolation,
+    traceback rendering and I/O are all left to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_context = request_context.get()
+        return record
+
+
+def configure_logging() -> QueueListener:
+    """Route all logging through a queue drained by a background thread"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    sink = logging.StreamHandler()
+    if LOG_FORMAT == 'json':
+        sink.setFormatter(JsonFormatter())
+    else:
+        sink.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [DeferredQueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, sink, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def _restart_after_fork():
+    # The listener thread does not survive fork; give the child its own
+    global _listener
+    if _listener is not None:
+        _listener = None
+        configure_logging()
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def should_log_access(status_code: int, duration_ms: float) -> bool:
+    """Sample routine access logs; errors and slow requests are always kept"""
+    if status_code >= 500 or duration_ms >= ACCESS_LOG_SLOW_MS:
+        return True
+    return random.random() < ACCESS_LOG_SAMPLE_RATE
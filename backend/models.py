@@ -1,8 +1,13 @@
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
-from datetime import datetime
+from pydantic import BaseModel, Field, EmailStr, TypeAdapter
+from typing import Any, List, Optional, Type, TypeVar
+from datetime import datetime, timedelta
+import os
 import uuid
 
+M = TypeVar("M", bound=BaseModel)
+
+TRIAL_DURATION = timedelta(hours=int(os.environ.get('TRIAL_DURATION_HOURS', '48')))
+
 # Subscription Plan Models
 class SubscriptionPlan(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -51,7 +56,7 @@ class TrialSignup(BaseModel):
     email: EmailStr
     status: str = "active"  # active, expired, cancelled
     trial_start: datetime = Field(default_factory=datetime.utcnow)
-    trial_end: Optional[datetime] = None
+    trial_end: Optional[datetime] = Field(default_factory=lambda: datetime.utcnow() + TRIAL_DURATION)
     activated: bool = False
     activation_code: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -68,6 +73,24 @@ class TrialSignupResponse(BaseModel):
     activation_code: str
     message: str
 
+class TrialStatusResponse(BaseModel):
+    """Public view of a trial; never includes the activation code"""
+    id: str
+    email: str
+    status: str
+    trial_start: datetime
+    trial_end: Optional[datetime] = None
+    activated: bool = False
+
+class TrialActivationRequest(BaseModel):
+    activation_code: str
+
+class TrialActivationResponse(BaseModel):
+    id: str
+    email: str
+    activated: bool
+    message: str
+
 # Reseller Application Models
 class ResellerApplication(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -93,6 +116,31 @@ class ResellerApplicationResponse(BaseModel):
     status: str
     message: str
 
+# Reseller Sale Models
+class ResellerSale(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    reseller_id: str
+    plan_id: str
+    price: float
+    original_price: float
+    sold_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ResellerSaleCreate(BaseModel):
+    reseller_id: str
+    plan_id: str
+    sold_at: Optional[datetime] = None
+
+class ResellerReportRow(BaseModel):
+    reseller_id: str
+    name: Optional[str] = None
+    email: Optional[str] = None
+    period: str
+    sales: int
+    revenue: float
+    discount: float
+    commission: float
+
 # Contact Message Models
 class ContactMessage(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -136,4 +184,32 @@ class AppSettings(BaseModel):
     support_email: str
     social_links: dict
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+# Plan Feature Dictionary Models
+class PlanFeature(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    label: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class PlanFeatureUpdate(BaseModel):
+    label: str
+
+# Construction helpers
+# model_construct only beats validation for models with EmailStr fields, whose
+# email validation dominates the cost; other models are built normally.
+def from_db(model: Type[M], document: dict) -> M:
+    """Build a model from a trusted database document without revalidating it"""
+    return model.model_construct(**document)
+
+def from_create(model: Type[M], payload: BaseModel, **fields) -> M:
+    """Build a full entity from an already validated *Create payload"""
+    return model.model_construct(**payload.model_dump(exclude_none=True), **fields)
+
+# Cached TypeAdapters, built once at import instead of on every call
+JSON_ADAPTER = TypeAdapter(Any)
+FEATURE_LIST_ADAPTER = TypeAdapter(List[Feature])
+SUBSCRIPTION_PLAN_LIST_ADAPTER = TypeAdapter(List[SubscriptionPlan])
+RESELLER_APPLICATION_CREATE_ADAPTER = TypeAdapter(ResellerApplicationCreate)
+CONTACT_MESSAGE_CREATE_ADAPTER = TypeAdapter(ContactMessageCreate)
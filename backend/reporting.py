@@ -0,0 +1,143 @@
+import logging
+import os
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pymongo.errors import DuplicateKeyError
+
+from database import (
+    reseller_applications_collection,
+    reseller_sales_collection,
+    reseller_reports_collection
+)
+
+logger = logging.getLogger(__name__)
+
+REPORT_CHUNK_SIZE = int(os.environ.get('REPORT_CHUNK_SIZE', '100000'))
+
+SALE_FIELDS = ["reseller_id", "price", "original_price"]
+AGGREGATE_COLUMNS = ["sales", "revenue", "discount", "commission"]
+
+_indexes_ready = False
+
+
+def period_bounds(period: str) -> Tuple[datetime, datetime]:
+    """Return the [start, end) datetimes of a YYYY-MM period"""
+    start = datetime.strptime(period, "%Y-%m")
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+
+def period_of(moment: datetime) -> str:
+    """YYYY-MM period (UTC) a timestamp falls in"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime("%Y-%m")
+
+
+def _is_closed(period: str) -> bool:
+    return period_bounds(period)[1] <= datetime.utcnow()
+
+
+async def _load_resellers() -> pd.DataFrame:
+    resellers = await reseller_applications_collection.find(
+        {}, {"_id": 0, "id": 1, "name": 1, "email": 1, "commission_rate": 1}
+    ).to_list(None)
+    frame = pd.DataFrame.from_records(resellers, columns=["id", "name", "email", "commission_rate"])
+    frame["commission_rate"] = frame["commission_rate"].fillna(0.0).astype(np.float64)
+    return frame.set_index("id")
+
+
+def _aggregate_chunk(rows: List[dict], rates: pd.Series) -> pd.DataFrame:
+    """Vectorized per-reseller totals for one chunk of sales"""
+    chunk = pd.DataFrame.from_records(rows, columns=SALE_FIELDS)
+    price = chunk["price"].to_numpy(dtype=np.float64)
+    original_price = chunk["original_price"].to_numpy(dtype=np.float64)
+    rate = chunk["reseller_id"].map(rates).fillna(0.0).to_numpy(dtype=np.float64)
+
+    chunk["sales"] = 1
+    chunk["revenue"] = price
+    chunk["discount"] = original_price - price
+    chunk["commission"] = price * rate
+    return chunk.groupby("reseller_id")[AGGREGATE_COLUMNS].sum()
+
+
+async def compute_report(period: str) -> List[dict]:
+    """Stream a period's sales in chunks and aggregate them per reseller"""
+    start, end = period_bounds(period)
+    resellers = await _load_resellers()
+    rates = resellers["commission_rate"]
+
+    cursor = reseller_sales_collection.find(
+        {"sold_at": {"$gte": start, "$lt": end}},
+        {"_id": 0, **{field: 1 for field in SALE_FIELDS}}
+    ).batch_size(REPORT_CHUNK_SIZE)
+
+    # Sums are additive, so each chunk is reduced before the next one is read
+    partials = []
+    rows = []
+    async for sale in cursor:
+        rows.append(sale)
+        if len(rows) >= REPORT_CHUNK_SIZE:
+            partials.append(_aggregate_chunk(rows, rates))
+            rows = []
+    if rows:
+        partials.append(_aggregate_chunk(rows, rates))
+    if not partials:
+        return []
+
+    totals = pd.concat(partials).groupby(level=0).sum()
+    totals = totals.join(resellers[["name", "email"]], how="left")
+    totals[["revenue", "discount", "commission"]] = totals[["revenue", "discount", "commission"]].round(2)
+    totals["period"] = period
+    totals = totals.reset_index(names="reseller_id").sort_values("revenue", ascending=False)
+    totals = totals.astype(object).where(totals.notna(), None)
+    return totals.to_dict(orient="records")
+
+
+async def get_report(period: str, refresh: bool = False) -> List[dict]:
+    """Return a period's report, reusing the cached copy for closed periods"""
+    await ensure_reporting_indexes()
+    cached = await reseller_reports_collection.find_one({"period": period}, {"_id": 0, "period": 0})
+    if not refresh and cached and "rows" in cached and _is_closed(period):
+        return cached["rows"]
+
+    # A sale recorded for the period while this report is computed bumps the
+    # version, and the now stale rows are then not cached
+    version = cached.get("version", 0) if cached else 0
+    rows = await compute_report(period)
+    try:
+        await reseller_reports_collection.update_one(
+            {"period": period, "version": version or {"$in": [0, None]}},
+            {"$set": {"rows": rows, "computed_at": datetime.utcnow()}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        logger.info("Reseller report for %s changed while computing; not cached", period)
+    logger.info("Computed reseller report for %s (%s resellers)", period, len(rows))
+    return rows
+
+
+async def invalidate_report(sold_at: datetime):
+    """Discard the cached report for the period a sale falls in"""
+    await reseller_reports_collection.update_one(
+        {"period": period_of(sold_at)},
+        {"$inc": {"version": 1}, "$unset": {"rows": "", "computed_at": ""}},
+        upsert=True
+    )
+
+
+async def ensure_reporting_indexes():
+    """Create the indexes used to stream a period's sales, once per process"""
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    await reseller_sales_collection.create_index([("sold_at", 1), ("reseller_id", 1)])
+    await reseller_reports_collection.create_index("period", unique=True)
+    _indexes_ready = True
@@ -1,11 +1,16 @@
-from fastapi import FastAPI, APIRouter, HTTPException, status
+from fastapi import FastAPI, APIRouter, BackgroundTasks, File, HTTPException, Query, Request, Response, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError, PyMongoError
 import os
 import logging
+from datetime import datetime
 from pathlib import Path
-from typing import List
-import secrets
+from typing import List, Optional
+import asyncio
+import math
+import time
+import uuid
 
 # Import models and database
 import sys
@@ -15,10 +20,13 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from models import (
     SubscriptionPlan, SubscriptionPlanCreate,
     Feature, FeatureCreate,
-    TrialSignup, TrialSignupCreate, TrialSignupResponse,
+    TrialSignup, TrialSignupCreate, TrialSignupResponse, TrialStatusResponse,
+    TrialActivationRequest, TrialActivationResponse,
     ResellerApplication, ResellerApplicationCreate, ResellerApplicationResponse,
+    ResellerSale, ResellerSaleCreate, ResellerReportRow,
     ContactMessage, ContactMessageCreate, ContactMessageResponse,
-    AppSettings
+    AppSettings, PlanFeature, PlanFeatureUpdate,
+    TRIAL_DURATION, FEATURE_LIST_ADAPTER, from_db, from_create
 )
 from database import (
     db, init_default_data, close_db_connection,
@@ -26,8 +34,36 @@ from database import (
     features_collection,
     trial_signups_collection,
     reseller_applications_collection,
-    contact_messages_collection,
-    app_settings_collection
+    reseller_sales_collection,
+    plan_features_collection
+)
+from archival import (
+    ARCHIVE_TIERS, ensure_archive_indexes, archival_loop, run_archival, find_archived
+)
+from contact_partitions import (
+    insert_contact_message, partition_name, find_contact_messages, list_partitions,
+    migrate_legacy_contact_messages
+)
+from activation import (
+    activation_filter, ensure_activation_indexes, activation_filter_loop,
+    issue_activation_code, redeem_activation_code, redemption_failure
+)
+from admission import AdmissionControlMiddleware, admission_controller
+from lead_import import IMPORT_TARGETS, detect_format, import_leads
+from log_config import configure_logging, request_context, access_logger, should_log_access
+from degraded import (
+    CircuitOpenError, db_breaker, last_known_good, write_spool, spool_replay_loop
+)
+from identity import (
+    identity_fields, email_key, ensure_identity_indexes, backfill_email_keys
+)
+from singleflight import SingleFlight
+from shared_catalog import get_shared_catalog, is_leader, refresh_loop as shared_catalog_refresh_loop
+from static_catalog import publish_catalog_snapshot_safely
+from catalog import (
+    ensure_catalog_indexes, get_plans_snapshot, rebuild_plans_snapshot, plans_changed,
+    migrate_legacy_plan_features, resolve_feature_ids, rename_plan_feature,
+    fetch_active_features, fetch_app_settings
 )
 
 ROOT_DIR = Path(__file__).parent
@@ -39,6 +75,9 @@ app = FastAPI(title="StreamMax Pro API", version="1.0.0")
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Shed excess load per route class before it queues on Mongo connections
+app.add_middleware(AdmissionControlMiddleware, controller=admission_controller)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -49,65 +88,187 @@ app.add_middleware(
 )
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# Request ids and access logging
+@app.middleware("http")
+async def request_logging(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    request_context.set({"request_id": request_id, "method": request.method, "path": request.url.path})
+    start = time.perf_counter()
+    response = await call_next(request)
+    duration_ms = (time.perf_counter() - start) * 1000
+    response.headers["X-Request-ID"] = request_id
+    if should_log_access(response.status_code, duration_ms):
+        route = request.scope.get("route")
+        access_logger.info(
+            "%s %s %s", request.method, request.url.path, response.status_code,
+            extra={
+                "route": route.path if route else None,
+                "status": response.status_code,
+                "duration_ms": round(duration_ms, 2)
+            }
+        )
+    return response
+
+# Coalesce concurrent identical catalog reads into one Mongo query per key
+CATALOG_FETCH_TIMEOUT = float(os.environ.get('CATALOG_FETCH_TIMEOUT', '5'))
+catalog_flight = SingleFlight(default_timeout=CATALOG_FETCH_TIMEOUT)
+
+def service_unavailable(error: CircuitOpenError) -> HTTPException:
+    """503 returned while the database circuit is open"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Service temporarily unavailable, please retry shortly",
+        headers={"Retry-After": str(math.ceil(error.retry_after) or 1)}
+    )
+
+async def read_catalog(key: str, fetch):
+    """Read a catalog document, serving the last known good copy if the database fails"""
+    async def guarded_fetch():
+        # The breaker wraps the shared query rather than each caller, so one
+        # failed query counts once however many requests were waiting on it
+        async with db_breaker:
+            value = await asyncio.wait_for(fetch(), CATALOG_FETCH_TIMEOUT)
+        await last_known_good.remember(key, value)
+        return value
+
+    try:
+        return await catalog_flight.do(key, guarded_fetch)
+    except (CircuitOpenError, PyMongoError, asyncio.TimeoutError) as e:
+        stale = last_known_good.get(key)
+        if stale is None:
+            raise
+        logger.warning("Serving last known good %s: %s", key, e)
+        return stale
+
+def shared_catalog_response(key: str) -> Optional[Response]:
+    """Serve a catalog body straight from shared memory under the multi-worker launcher"""
+    catalog = get_shared_catalog()
+    body = catalog.read(key) if catalog else None
+    if not body or body == b"null":
+        return None
+    return Response(content=body, media_type="application/json")
+
 # Subscription Plans Endpoints
 @api_router.get("/plans", response_model=List[SubscriptionPlan])
 async def get_subscription_plans():
     """Get all subscription plans"""
+    shared = shared_catalog_response("plans")
+    if shared:
+        return shared
     try:
-        plans = await subscription_plans_collection.find().to_list(1000)
-        return [SubscriptionPlan(**plan) for plan in plans]
+        return await read_catalog("plans", get_plans_snapshot)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except Exception as e:
-        logger.error(f"Error fetching subscription plans: {e}")
+        logger.error("Error fetching subscription plans: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error fetching subscription plans"
         )
 
 @api_router.post("/plans", response_model=SubscriptionPlan)
-async def create_subscription_plan(plan: SubscriptionPlanCreate):
+async def create_subscription_plan(plan: SubscriptionPlanCreate, background_tasks: BackgroundTasks):
     """Create a new subscription plan"""
     try:
-        plan_dict = plan.dict()
-        plan_obj = SubscriptionPlan(**plan_dict)
-        await subscription_plans_collection.insert_one(plan_obj.dict())
-        return plan_obj
+        async with db_breaker:
+            plan_obj = SubscriptionPlan(**plan.model_dump())
+            plan_doc = plan_obj.model_dump()
+            plan_doc["feature_ids"] = await resolve_feature_ids(plan_doc.pop("features"))
+            await subscription_plans_collection.insert_one(plan_doc)
+            await plans_changed()
+            background_tasks.add_task(publish_catalog_snapshot_safely)
+            return plan_obj
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except Exception as e:
-        logger.error(f"Error creating subscription plan: {e}")
+        logger.error("Error creating subscription plan: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error creating subscription plan"
         )
 
+# Plan Feature Dictionary Endpoints
+@api_router.get("/plan-features", response_model=List[PlanFeature])
+async def get_plan_features():
+    """Get the plan feature dictionary"""
+    try:
+        async with db_breaker:
+            features = await plan_features_collection.find().to_list(1000)
+            return [PlanFeature(**feature) for feature in features]
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        logger.error("Error fetching plan features: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error fetching plan features"
+        )
+
+@api_router.put("/plan-features/{feature_id}", response_model=PlanFeature)
+async def update_plan_feature(feature_id: str, update: PlanFeatureUpdate, background_tasks: BackgroundTasks):
+    """Rename a plan feature across every plan that references it"""
+    try:
+        async with db_breaker:
+            try:
+                feature = await rename_plan_feature(feature_id, update.label)
+            except DuplicateKeyError:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A plan feature with this label already exists"
+                )
+            if not feature:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Plan feature not found"
+                )
+            background_tasks.add_task(publish_catalog_snapshot_safely)
+            return PlanFeature(**feature)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error updating plan feature: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error updating plan feature"
+        )
+
 # Features Endpoints
 @api_router.get("/features", response_model=List[Feature])
 async def get_features():
     """Get all active features"""
+    shared = shared_catalog_response("features")
+    if shared:
+        return shared
     try:
-        features = await features_collection.find({"active": True}).sort("order", 1).to_list(1000)
-        return [Feature(**feature) for feature in features]
+        features = await read_catalog("features", fetch_active_features)
+        return FEATURE_LIST_ADAPTER.validate_python(features)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except Exception as e:
-        logger.error(f"Error fetching features: {e}")
+        logger.error("Error fetching features: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error fetching features"
         )
 
 @api_router.post("/features", response_model=Feature)
-async def create_feature(feature: FeatureCreate):
+async def create_feature(feature: FeatureCreate, background_tasks: BackgroundTasks):
     """Create a new feature"""
     try:
-        feature_dict = feature.dict()
-        feature_obj = Feature(**feature_dict)
-        await features_collection.insert_one(feature_obj.dict())
-        return feature_obj
+        async with db_breaker:
+            feature_obj = Feature(**feature.model_dump())
+            await features_collection.insert_one(feature_obj.model_dump())
+            background_tasks.add_task(publish_catalog_snapshot_safely)
+            return feature_obj
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except Exception as e:
-        logger.error(f"Error creating feature: {e}")
+        logger.error("Error creating feature: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error creating feature"
@@ -117,61 +278,144 @@ async def create_feature(feature: FeatureCreate):
 @api_router.post("/trial", response_model=TrialSignupResponse)
 async def create_trial_signup(trial: TrialSignupCreate):
     """Create a new trial signup"""
+    identity = identity_fields(trial.email)
     try:
-        # Check if email already exists
-        existing_trial = await trial_signups_collection.find_one({"email": trial.email})
-        if existing_trial:
+        async with db_breaker:
+            # Check if email already exists
+            existing_trial = await trial_signups_collection.find_one({"email_key": identity["email_key"]})
+            if not existing_trial:
+                # Create new trial
+                issued = issue_activation_code()
+                trial_obj = from_create(TrialSignup, trial, activation_code=issued["activation_code"])
+                try:
+                    await trial_signups_collection.insert_one({**trial_obj.model_dump(), **identity, **issued})
+                    return TrialSignupResponse(
+                        id=trial_obj.id,
+                        email=trial.email,
+                        status="active",
+                        trial_start=trial_obj.trial_start,
+                        activation_code=trial_obj.activation_code,
+                        message="Trial activated successfully! Check your email for login credentials."
+                    )
+                except DuplicateKeyError:
+                    # A concurrent signup for the same email inserted first
+                    existing_trial = await trial_signups_collection.find_one({"email_key": identity["email_key"]})
+                    if not existing_trial:
+                        raise
+
             # Update existing trial
-            activation_code = secrets.token_hex(16)
+            issued = issue_activation_code()
+            now = datetime.utcnow()
             await trial_signups_collection.update_one(
-                {"email": trial.email},
-                {"$set": {"activation_code": activation_code, "status": "active"}}
+                {"email_key": identity["email_key"]},
+                {"$set": {
+                    **issued,
+                    "status": "active",
+                    # The new code starts a trial period that has not been redeemed yet
+                    "activated": False,
+                    "trial_end": now + TRIAL_DURATION,
+                    "updated_at": now
+                }}
             )
             return TrialSignupResponse(
                 id=existing_trial["id"],
                 email=trial.email,
                 status="active",
                 trial_start=existing_trial["trial_start"],
-                activation_code=activation_code,
+                activation_code=issued["activation_code"],
                 message="Trial reactivated successfully! Check your email for login credentials."
             )
-        else:
-            # Create new trial
-            trial_dict = trial.dict()
-            activation_code = secrets.token_hex(16)
-            trial_obj = TrialSignup(**trial_dict, activation_code=activation_code)
-            await trial_signups_collection.insert_one(trial_obj.dict())
-            
-            return TrialSignupResponse(
-                id=trial_obj.id,
-                email=trial.email,
-                status="active",
-                trial_start=trial_obj.trial_start,
-                activation_code=activation_code,
-                message="Trial activated successfully! Check your email for login credentials."
-            )
+    except CircuitOpenError as e:
+        if not write_spool.enabled:
+            raise service_unavailable(e)
+        issued = issue_activation_code()
+        trial_obj = from_create(TrialSignup, trial, activation_code=issued["activation_code"])
+        await write_spool.spool(
+            "trial_signups", {"email_key": identity["email_key"]}, {**trial_obj.model_dump(), **identity, **issued}
+        )
+        return TrialSignupResponse(
+            id=trial_obj.id,
+            email=trial.email,
+            status="active",
+            trial_start=trial_obj.trial_start,
+            activation_code=trial_obj.activation_code,
+            message="Trial request received! Check your email for login credentials shortly."
+        )
     except Exception as e:
-        logger.error(f"Error creating trial signup: {e}")
+        logger.error("Error creating trial signup: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error creating trial signup"
         )
 
-@api_router.get("/trial/{email}")
+@api_router.post("/trial/activate", response_model=TrialActivationResponse)
+async def activate_trial(request: TrialActivationRequest):
+    """Redeem a trial activation code"""
+    code = request.activation_code.strip().lower()
+    # Codes the filter has never seen, even after catching up with other workers, are rejected here
+    if not await activation_filter.admits(code):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Invalid activation code"
+        )
+    try:
+        async with db_breaker:
+            trial = await redeem_activation_code(code)
+            if not trial:
+                failure = await redemption_failure(code)
+                if failure == "redeemed":
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="Activation code already redeemed"
+                    )
+                if failure == "expired":
+                    raise HTTPException(
+                        status_code=status.HTTP_410_GONE,
+                        detail="Trial has expired"
+                    )
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Invalid activation code"
+                )
+        return TrialActivationResponse(
+            id=trial["id"],
+            email=trial["email"],
+            activated=True,
+            message="Trial activated! Enjoy your streaming."
+        )
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error activating trial: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error activating trial"
+        )
+
+@api_router.get("/trial/{email}", response_model=TrialStatusResponse)
 async def get_trial_status(email: str):
     """Get trial status for an email"""
     try:
-        trial = await trial_signups_collection.find_one({"email": email})
-        if not trial:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Trial not found"
+        async with db_breaker:
+            # The activation code redeems the trial, so it is only ever returned at signup
+            trial = await trial_signups_collection.find_one(
+                {"email_key": email_key(email)},
+                {"_id": 0, "id": 1, "email": 1, "status": 1, "trial_start": 1, "trial_end": 1, "activated": 1}
             )
-        return TrialSignup(**trial)
+            if not trial:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Trial not found"
+                )
+            return TrialStatusResponse(**trial)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching trial status: {e}")
+        logger.error("Error fetching trial status: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error fetching trial status"
@@ -181,98 +425,310 @@ async def get_trial_status(email: str):
 @api_router.post("/reseller", response_model=ResellerApplicationResponse)
 async def create_reseller_application(application: ResellerApplicationCreate):
     """Create a new reseller application"""
+    identity = identity_fields(application.email)
     try:
-        # Check if email already exists
-        existing_app = await reseller_applications_collection.find_one({"email": application.email})
-        if existing_app:
-            return ResellerApplicationResponse(
-                id=existing_app["id"],
-                name=application.name,
-                email=application.email,
-                status=existing_app["status"],
-                message="Application already exists. We'll update you on the status soon."
-            )
-        
-        # Create new application
-        app_dict = application.dict()
-        app_obj = ResellerApplication(**app_dict)
-        await reseller_applications_collection.insert_one(app_obj.dict())
-        
-        return ResellerApplicationResponse(
-            id=app_obj.id,
-            name=application.name,
-            email=application.email,
-            status="pending",
-            message="Application submitted successfully! We'll contact you within 24 hours."
+        async with db_breaker:
+            # Check if email already exists
+            existing_app = await reseller_applications_collection.find_one({"email_key": identity["email_key"]})
+            if not existing_app:
+                # Create new application
+                app_obj = from_create(ResellerApplication, application)
+                try:
+                    await reseller_applications_collection.insert_one({**app_obj.model_dump(), **identity})
+                except DuplicateKeyError:
+                    # A concurrent application for the same email inserted first
+                    existing_app = await reseller_applications_collection.find_one({"email_key": identity["email_key"]})
+                    if not existing_app:
+                        raise
+            if existing_app:
+                return ResellerApplicationResponse(
+                    id=existing_app["id"],
+                    name=application.name,
+                    email=application.email,
+                    status=existing_app["status"],
+                    message="Application already exists. We'll update you on the status soon."
+                )
+    except CircuitOpenError as e:
+        if not write_spool.enabled:
+            raise service_unavailable(e)
+        app_obj = from_create(ResellerApplication, application)
+        await write_spool.spool(
+            "reseller_applications", {"email_key": identity["email_key"]}, {**app_obj.model_dump(), **identity}
         )
     except Exception as e:
-        logger.error(f"Error creating reseller application: {e}")
+        logger.error("Error creating reseller application: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error creating reseller application"
         )
 
+    return ResellerApplicationResponse(
+        id=app_obj.id,
+        name=application.name,
+        email=application.email,
+        status="pending",
+        message="Application submitted successfully! We'll contact you within 24 hours."
+    )
+
 @api_router.get("/reseller", response_model=List[ResellerApplication])
 async def get_reseller_applications():
     """Get all reseller applications"""
     try:
-        applications = await reseller_applications_collection.find().to_list(1000)
-        return [ResellerApplication(**app) for app in applications]
+        async with db_breaker:
+            applications = await reseller_applications_collection.find().to_list(1000)
+            return [from_db(ResellerApplication, app) for app in applications]
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except Exception as e:
-        logger.error(f"Error fetching reseller applications: {e}")
+        logger.error("Error fetching reseller applications: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error fetching reseller applications"
         )
 
+@api_router.post("/reseller/sales", response_model=ResellerSale)
+async def create_reseller_sale(sale: ResellerSaleCreate):
+    """Record a subscription sold by a reseller"""
+    # reporting pulls in pandas/numpy, so it is only loaded once a sale is recorded
+    from reporting import invalidate_report
+
+    try:
+        async with db_breaker:
+            reseller = await reseller_applications_collection.find_one({"id": sale.reseller_id}, {"_id": 1})
+            plan = await subscription_plans_collection.find_one({"id": sale.plan_id})
+            if not reseller or not plan:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Reseller or plan not found"
+                )
+            sale_obj = ResellerSale(
+                **sale.model_dump(exclude_none=True),
+                price=plan["price"],
+                original_price=plan["original_price"]
+            )
+            await reseller_sales_collection.insert_one(sale_obj.model_dump())
+            # Sales may be backdated, so a closed period's cached report can change
+            await invalidate_report(sale_obj.sold_at)
+            return sale_obj
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error recording reseller sale: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error recording reseller sale"
+        )
+
+# Reporting Endpoints
+@api_router.get("/reports/resellers", response_model=List[ResellerReportRow])
+async def get_reseller_report(period: str, refresh: bool = False):
+    """Get per-reseller sales, revenue, discount and commission for a YYYY-MM period"""
+    # pandas/numpy are only loaded once a report is requested
+    from reporting import get_report, period_bounds
+
+    try:
+        period_bounds(period)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Period must be formatted as YYYY-MM"
+        )
+    try:
+        async with db_breaker:
+            return await get_report(period, refresh=refresh)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        logger.error("Error computing reseller report: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error computing reseller report"
+        )
+
 # Contact Message Endpoints
 @api_router.post("/contact", response_model=ContactMessageResponse)
 async def create_contact_message(message: ContactMessageCreate):
     """Create a new contact message"""
     try:
-        message_dict = message.dict()
-        message_obj = ContactMessage(**message_dict)
-        await contact_messages_collection.insert_one(message_obj.dict())
-        
-        return ContactMessageResponse(
-            id=message_obj.id,
-            name=message.name,
-            email=message.email,
-            subject=message.subject,
-            message=message.message,
-            status="new"
+        message_obj = from_create(ContactMessage, message)
+        async with db_breaker:
+            await insert_contact_message(message_obj.model_dump())
+    except CircuitOpenError as e:
+        if not write_spool.enabled:
+            raise service_unavailable(e)
+        await write_spool.spool(
+            partition_name(message_obj.created_at), {"id": message_obj.id}, message_obj.model_dump()
         )
     except Exception as e:
-        logger.error(f"Error creating contact message: {e}")
+        logger.error("Error creating contact message: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error creating contact message"
         )
 
+    return ContactMessageResponse(
+        id=message_obj.id,
+        name=message.name,
+        email=message.email,
+        subject=message.subject,
+        message=message.message,
+        status="new"
+    )
+
+@api_router.get("/contact")
+async def get_contact_messages(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Get contact messages created in a time range, newest first"""
+    try:
+        async with db_breaker:
+            return await find_contact_messages(start, end, status=status_filter, limit=limit)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        logger.error("Error fetching contact messages: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error fetching contact messages"
+        )
+
+@api_router.get("/contact/partitions")
+async def get_contact_partitions():
+    """List the monthly contact message partitions"""
+    try:
+        async with db_breaker:
+            return {"partitions": await list_partitions()}
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        logger.error("Error listing contact partitions: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error listing contact partitions"
+        )
+
+# Bulk Import Endpoints
+@api_router.post("/import/{kind}")
+async def import_leads_file(kind: str, file: UploadFile = File(...), format: Optional[str] = None):
+    """Bulk import reseller leads or contacts from a CSV or NDJSON upload"""
+    if kind not in IMPORT_TARGETS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Import target not found"
+        )
+    file_format = format or detect_format(file.filename, file.content_type)
+    if file_format not in ("csv", "ndjson"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload a .csv or .ndjson file, or pass format=csv|ndjson"
+        )
+    try:
+        return await import_leads(kind, file.file, file_format)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be UTF-8 encoded"
+        )
+    except Exception as e:
+        logger.error("Error importing %s: %s", kind, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error importing file"
+        )
+
+# Archive Endpoints
+@api_router.get("/archive/{kind}")
+async def get_archived_records(kind: str, email: Optional[str] = None, limit: int = Query(100, ge=1, le=1000)):
+    """Get archived contact messages or trial signups"""
+    if kind not in ARCHIVE_TIERS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Archive not found"
+        )
+    try:
+        async with db_breaker:
+            return await find_archived(kind, email=email, limit=limit)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        logger.error("Error fetching archived records: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error fetching archived records"
+        )
+
+@api_router.post("/archive/run")
+async def run_archive_pass():
+    """Run an archival pass immediately"""
+    try:
+        async with db_breaker:
+            return {"archived": await run_archival()}
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        logger.error("Error running archival pass: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error running archival pass"
+        )
+
 # App Settings Endpoints
 @api_router.get("/settings")
 async def get_app_settings():
     """Get application settings"""
+    shared = shared_catalog_response("settings")
+    if shared:
+        return shared
     try:
-        settings = await app_settings_collection.find_one({"id": "app_settings_main"})
+        settings = await read_catalog("settings", fetch_app_settings)
         if not settings:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Settings not found"
             )
-        # Convert ObjectId to string to make it JSON serializable
-        if "_id" in settings:
-            settings["_id"] = str(settings["_id"])
         return settings
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching app settings: {e}")
+        logger.error("Error fetching app settings: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error fetching app settings"
         )
 
+# Single-flight Stats
+@api_router.get("/stats/singleflight")
+async def get_singleflight_stats():
+    """Get request coalescing counters for catalog reads"""
+    return catalog_flight.snapshot()
+
+# Admission Control Stats
+@api_router.get("/stats/admission")
+async def get_admission_stats():
+    """Get per route class concurrency and queue depth"""
+    return admission_controller.snapshot()
+
+# Activation Filter Stats
+@api_router.get("/stats/activation")
+async def get_activation_stats():
+    """Get activation code filter counters"""
+    return activation_filter.snapshot()
+
+# Circuit Breaker Stats
+@api_router.get("/stats/circuit")
+async def get_circuit_stats():
+    """Get database circuit breaker state"""
+    return db_breaker.snapshot()
+
 # Health Check
 @api_router.get("/health")
 async def health_check():
@@ -291,10 +747,31 @@ app.include_router(api_router)
 @app.on_event("startup")
 async def startup_db():
     """Initialize database on startup"""
+    app.state.background_tasks = [asyncio.create_task(activation_filter_loop())]
+    if not is_leader():
+        return
     await init_default_data()
+    await ensure_catalog_indexes()
+    await migrate_legacy_plan_features()
+    await rebuild_plans_snapshot()
+    await ensure_archive_indexes()
+    await migrate_legacy_contact_messages()
+    await backfill_email_keys()
+    await ensure_identity_indexes()
+    await ensure_activation_indexes()
+    await publish_catalog_snapshot_safely()
+    app.state.background_tasks += [
+        asyncio.create_task(archival_loop()),
+        asyncio.create_task(spool_replay_loop())
+    ]
+    if get_shared_catalog():
+        app.state.background_tasks.append(asyncio.create_task(shared_catalog_refresh_loop()))
+    await write_spool.replay()
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_db():
     """Close database connection on shutdown"""
+    for task in getattr(app.state, "background_tasks", []):
+        task.cancel()
     await close_db_connection()
\ No newline at end of file
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Dict, Optional
+
+from static_catalog import render_catalog
+
+logger = logging.getLogger(__name__)
+
+CATALOG_SHM_SIZE = int(os.environ.get('CATALOG_SHM_SIZE', str(1024 * 1024)))
+CATALOG_SHM_REFRESH_SECONDS = float(os.environ.get('CATALOG_SHM_REFRESH_SECONDS', '5'))
+
+CATALOG_KEYS = ("plans", "features", "settings")
+
+# Header: sequence number, then (offset, length) per catalog key
+_SEQ = struct.Struct("Q")
+_SLOT = struct.Struct("II")
+_HEADER_SIZE = _SEQ.size + _SLOT.size * len(CATALOG_KEYS)
+
+
+class SharedCatalog:
+    """Catalog response bodies in a shared memory segment.
+
+    A single leader process writes; any number of workers read. Writes are
+    guarded by a sequence lock: the sequence is odd while a write is in
+    progress, and readers retry if it changed while they were reading.
+    Readers slice the mapped buffer directly; the only copy is into the
+    response body.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self.shm = shm
+        self.buf = shm.buf
+
+    @classmethod
+    def create(cls, size: int = CATALOG_SHM_SIZE) -> "SharedCatalog":
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        shm.buf[:_HEADER_SIZE] = bytes(_HEADER_SIZE)
+        return cls(shm)
+
+    def _seq(self) -> int:
+        return _SEQ.unpack_from(self.buf, 0)[0]
+
+    def write(self, bodies: Dict[str, bytes]):
+        """Replace all catalog bodies; only the leader may call this"""
+        total = _HEADER_SIZE + sum(len(bodies[key]) for key in CATALOG_KEYS)
+        if total > len(self.buf):
+            raise ValueError(f"Catalog needs {total} bytes, segment has {len(self.buf)}")
+
+        seq = self._seq()
+        _SEQ.pack_into(self.buf, 0, seq + 1)
+        offset = _HEADER_SIZE
+        for index, key in enumerate(CATALOG_KEYS):
+            body = bodies[key]
+            self.buf[offset:offset + len(body)] = body
+            _SLOT.pack_into(self.buf, _SEQ.size + index * _SLOT.size, offset, len(body))
+            offset += len(body)
+        _SEQ.pack_into(self.buf, 0, seq + 2)
+
+    def read(self, key: str, attempts: int = 3) -> Optional[bytes]:
+        """Return the body for key, or None if empty or a write kept racing"""
+        index = CATALOG_KEYS.index(key)
+        for _ in range(attempts):
+            seq = self._seq()
+            if seq == 0:
+                return None
+            if seq % 2:
+                time.sleep(0)
+                continue
+            offset, length = _SLOT.unpack_from(self.buf, _SEQ.size + index * _SLOT.size)
+            body = bytes(self.buf[offset:offset + length])
+            if self._seq() == seq:
+                return body
+        return None
+
+    def close(self):
+        self.buf.release()
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+# Set by the launcher in each worker; None when running a plain uvicorn process
+_shared_catalog: Optional[SharedCatalog] = None
+_is_leader = True
+
+
+def attach(catalog: SharedCatalog, leader: bool):
+    """Install the shared catalog for this worker process"""
+    global _shared_catalog, _is_leader
+    _shared_catalog = catalog
+    _is_leader = leader
+
+
+def get_shared_catalog() -> Optional[SharedCatalog]:
+    return _shared_catalog
+
+
+def is_leader() -> bool:
+    """True for the worker that owns startup tasks and catalog refreshes"""
+    return _is_leader
+
+
+async def refresh_loop():
+    """Leader loop re-rendering the catalog into shared memory"""
+    while True:
+        try:
+            _shared_catalog.write(await render_catalog())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error refreshing shared catalog: %s", e)
+        await asyncio.sleep(CATALOG_SHM_REFRESH_SECONDS)
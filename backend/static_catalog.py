@@ -0,0 +1,99 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from models import FEATURE_LIST_ADAPTER, JSON_ADAPTER
+from catalog import get_plans_snapshot, fetch_active_features, fetch_app_settings
+
+logger = logging.getLogger(__name__)
+
+# Directory served by the static server / CDN; publishing is disabled when unset
+SNAPSHOT_DIR = os.environ.get('CATALOG_SNAPSHOT_DIR')
+SNAPSHOT_GZIP = os.environ.get('CATALOG_SNAPSHOT_GZIP', 'true').lower() == 'true'
+SNAPSHOT_KEEP_VERSIONS = int(os.environ.get('CATALOG_SNAPSHOT_KEEP_VERSIONS', '3'))
+
+MANIFEST_NAME = "manifest.json"
+
+
+async def render_catalog() -> Dict[str, bytes]:
+    """Render the /api/plans, /api/features and /api/settings response bodies"""
+    features = FEATURE_LIST_ADAPTER.validate_python(await fetch_active_features())
+    return {
+        "plans": JSON_ADAPTER.dump_json(await get_plans_snapshot()),
+        "features": FEATURE_LIST_ADAPTER.dump_json(features),
+        "settings": JSON_ADAPTER.dump_json(await fetch_app_settings())
+    }
+
+
+def write_atomic(path: Path, data: bytes):
+    """Replace path with data so readers only ever see a complete file"""
+    # A unique temp file per write, so workers publishing at once never share one
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False
+    ) as tmp_file:
+        tmp_file.write(data)
+    try:
+        # NamedTemporaryFile is owner-only; the files are served by another process
+        os.chmod(tmp_file.name, 0o644)
+        os.replace(tmp_file.name, path)
+    except BaseException:
+        os.unlink(tmp_file.name)
+        raise
+
+
+def _prune(directory: Path, name: str, current: str):
+    versions = sorted(
+        (path for path in directory.glob(f"{name}.*.json") if path.name != current),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True
+    )
+    # Keep a few previous versions for clients still holding an older manifest
+    for path in versions[SNAPSHOT_KEEP_VERSIONS - 1:]:
+        path.unlink(missing_ok=True)
+        Path(str(path) + ".gz").unlink(missing_ok=True)
+
+
+def write_snapshot_files(directory: Path, bodies: Dict[str, bytes], compress: bool = SNAPSHOT_GZIP) -> dict:
+    """Write content-hashed snapshot files and the manifest pointing at them"""
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = {"version": datetime.utcnow().strftime("%Y%m%d%H%M%S%f"), "files": {}}
+    for name, body in bodies.items():
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        filename = f"{name}.{digest}.json"
+        path = directory / filename
+        if not path.exists():
+            write_atomic(path, body)
+            if compress:
+                write_atomic(Path(str(path) + ".gz"), gzip.compress(body, compresslevel=9))
+        manifest["files"][name] = {"file": filename, "hash": digest, "size": len(body)}
+        _prune(directory, name, filename)
+
+    # The manifest goes last so it never references a file that is not written yet
+    write_atomic(directory / MANIFEST_NAME, json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
+
+
+async def publish_catalog_snapshot(directory: Optional[str] = None) -> Optional[dict]:
+    """Render the catalog and publish it to the snapshot directory"""
+    directory = directory or SNAPSHOT_DIR
+    if not directory:
+        return None
+    bodies = await render_catalog()
+    manifest = await asyncio.to_thread(write_snapshot_files, Path(directory), bodies)
+    logger.info("Published catalog snapshot %s to %s", manifest['version'], directory)
+    return manifest
+
+
+async def publish_catalog_snapshot_safely():
+    """On-write trigger; a failed publish must not fail the write itself"""
+    try:
+        await publish_catalog_snapshot()
+    except Exception as e:
+        logger.error("Error publishing catalog snapshot: %s", e)
@@ -0,0 +1,67 @@
+"""Concurrent activation code redemption stress test against a running API.
+
+Creates trials, then redeems every code from several clients at once
+(each valid code is submitted twice) mixed with random guesses. Exactly
+one redemption per code must succeed; duplicates get 409 and guesses 404.
+
+    python stress_activation.py --base-url http://localhost:8001 --trials 500
+"""
+import secrets
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import typer
+
+
+def main(
+    base_url: str = typer.Option("http://localhost:8001", help="API base URL"),
+    trials: int = typer.Option(500, help="Trials to create and redeem"),
+    guesses: int = typer.Option(2000, help="Random invalid codes to submit"),
+    concurrency: int = typer.Option(64, help="Concurrent client threads")
+):
+    """Redeem activation codes concurrently and check the outcomes"""
+    api_url = f"{base_url}/api"
+    session = requests.Session()
+
+    def create_trial(_):
+        email = f"stress-{uuid.uuid4().hex[:12]}@example.com"
+        response = session.post(f"{api_url}/trial", json={"email": email}, timeout=30)
+        response.raise_for_status()
+        return response.json()["activation_code"]
+
+    def redeem(code):
+        response = session.post(f"{api_url}/trial/activate", json={"activation_code": code}, timeout=30)
+        return code, response.status_code
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        codes = list(pool.map(create_trial, range(trials)))
+        typer.echo(f"Created {len(codes)} trials")
+
+        attempts = codes * 2 + [secrets.token_hex(16) for _ in range(guesses)]
+        start = time.perf_counter()
+        results = list(pool.map(redeem, attempts))
+        elapsed = time.perf_counter() - start
+
+    outcomes = Counter(status for _, status in results)
+    successes = Counter(code for code, status in results if status == 200)
+    typer.echo(f"{len(attempts)} redemptions in {elapsed:.2f}s ({len(attempts) / elapsed:.0f} req/s)")
+    typer.echo(f"Status counts: {dict(outcomes)}")
+
+    failures = []
+    if set(successes) != set(codes):
+        failures.append(f"{len(set(codes) - set(successes))} valid codes were never redeemed")
+    if any(count > 1 for count in successes.values()):
+        failures.append("some codes were redeemed more than once")
+    if outcomes[409] != trials or outcomes[404] != guesses:
+        failures.append("unexpected 409/404 counts")
+
+    for failure in failures:
+        typer.echo(f"FAILED: {failure}")
+    raise typer.Exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    typer.run(main)
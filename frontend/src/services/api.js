@@ -2,6 +2,7 @@ import axios from 'axios';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API_BASE = `${BACKEND_URL}/api`;
+const CATALOG_SNAPSHOT_URL = process.env.REACT_APP_CATALOG_SNAPSHOT_URL;
 
 // Create axios instance with default config
 const api = axios.create({
@@ -36,13 +37,46 @@ api.interceptors.response.use(
   }
 );
 
+// Static catalog snapshot (served from a CDN), loaded once per page view
+let manifestPromise = null;
+
+const getSnapshotManifest = () => {
+  if (!manifestPromise) {
+    manifestPromise = axios
+      .get(`${CATALOG_SNAPSHOT_URL}/manifest.json`, { timeout: 3000 })
+      .then((response) => response.data)
+      .catch((error) => {
+        manifestPromise = null;
+        throw error;
+      });
+  }
+  return manifestPromise;
+};
+
+// Prefer the static snapshot and fall back to the API when it is unavailable
+const getCatalog = async (name, path) => {
+  if (CATALOG_SNAPSHOT_URL) {
+    try {
+      const manifest = await getSnapshotManifest();
+      const entry = manifest.files[name];
+      if (entry) {
+        const response = await axios.get(`${CATALOG_SNAPSHOT_URL}/${entry.file}`, { timeout: 3000 });
+        return response.data;
+      }
+    } catch (error) {
+      console.warn(`Catalog snapshot for ${name} unavailable, using API:`, error);
+    }
+  }
+  const response = await api.get(path);
+  return response.data;
+};
+
 // API service functions
 export const apiService = {
   // Subscription Plans
   getSubscriptionPlans: async () => {
     try {
-      const response = await api.get('/plans');
-      return response.data;
+      return await getCatalog('plans', '/plans');
     } catch (error) {
       console.error('Error fetching subscription plans:', error);
       throw error;
@@ -52,8 +86,7 @@ export const apiService = {
   // Features
   getFeatures: async () => {
     try {
-      const response = await api.get('/features');
-      return response.data;
+      return await getCatalog('features', '/features');
     } catch (error) {
       console.error('Error fetching features:', error);
       throw error;
@@ -107,8 +140,7 @@ export const apiService = {
   // App Settings
   getAppSettings: async () => {
     try {
-      const response = await api.get('/settings');
-      return response.data;
+      return await getCatalog('settings', '/settings');
     } catch (error) {
       console.error('Error fetching app settings:', error);
       throw error;
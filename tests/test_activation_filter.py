@@ -0,0 +1,138 @@
+import asyncio
+import secrets
+from datetime import datetime, timedelta
+
+import pytest
+
+import activation
+from activation import ActivationFilter, BloomFilter
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    codes = [secrets.token_hex(16) for _ in range(1000)]
+    for code in codes:
+        bloom.add(code)
+    assert all(bloom.might_contain(code) for code in codes)
+    assert bloom.count == 1000
+
+
+def test_bloom_filter_false_positive_rate_is_near_target():
+    bloom = BloomFilter(1000, 0.01)
+    for _ in range(1000):
+        bloom.add(secrets.token_hex(16))
+    false_positives = sum(bloom.might_contain(secrets.token_hex(16)) for _ in range(10000))
+    assert false_positives < 300
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+class FakeTrials:
+    def __init__(self):
+        self.documents = []
+        self.queries = []
+
+    def issue(self, issued_at):
+        code = secrets.token_hex(16)
+        self.documents.append({"activation_code": code, "activation_code_issued_at": issued_at})
+        return code
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        since = query.get("activation_code_issued_at", {}).get("$gte")
+        return FakeCursor([
+            document for document in self.documents
+            if since is None or document["activation_code_issued_at"] >= since
+        ])
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def trials(monkeypatch):
+    fake = FakeTrials()
+    monkeypatch.setattr(activation, "trial_signups_collection", fake)
+    return fake
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(activation.time, "monotonic", fake)
+    return fake
+
+
+def make_filter():
+    return ActivationFilter(capacity=1000, fp_rate=0.001)
+
+
+def test_code_issued_by_another_worker_is_admitted(trials, clock):
+    trials.issue(datetime.utcnow() - timedelta(days=1))
+    activation_filter = make_filter()
+
+    async def scenario():
+        await activation_filter.refresh()
+        # Issued by a different worker after this worker's filter was loaded
+        code = trials.issue(datetime.utcnow())
+        clock.now += activation.ACTIVATION_FILTER_CATCHUP_SECONDS
+        return await activation_filter.admits(code), await activation_filter.admits(secrets.token_hex(16))
+
+    assert asyncio.run(scenario()) == (True, False)
+    assert activation_filter.stats["caught_up"] == 1
+    assert activation_filter.stats["rejected_filter"] == 1
+    # Only the first load scans every code; top-ups start from the high-water mark
+    assert "activation_code_issued_at" not in trials.queries[0]
+    assert all("activation_code_issued_at" in query for query in trials.queries[1:])
+
+
+def test_guesses_within_the_catch_up_window_skip_the_database(trials, clock):
+    activation_filter = make_filter()
+
+    async def scenario():
+        await activation_filter.refresh()
+        clock.now += activation.ACTIVATION_FILTER_CATCHUP_SECONDS / 2
+        return [await activation_filter.admits(secrets.token_hex(16)) for _ in range(20)]
+
+    assert not any(asyncio.run(scenario()))
+    assert len(trials.queries) == 1
+
+
+def test_guesses_trigger_at_most_one_top_up_per_window(trials, clock):
+    activation_filter = make_filter()
+
+    async def scenario():
+        await activation_filter.refresh()
+        clock.now += activation.ACTIVATION_FILTER_CATCHUP_SECONDS
+        guesses = [secrets.token_hex(16) for _ in range(20)]
+        first = await asyncio.gather(*(activation_filter.admits(code) for code in guesses))
+        second = [await activation_filter.admits(code) for code in guesses]
+        return first + second
+
+    assert not any(asyncio.run(scenario()))
+    assert len(trials.queries) == 2
+
+
+def test_malformed_codes_are_rejected_without_a_query(trials):
+    activation_filter = make_filter()
+
+    assert asyncio.run(activation_filter.admits("not-a-code")) is False
+    assert trials.queries == []
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionControlMiddleware, RouteClassLimiter
+
+TINY_LIMITS = {"default": {"limit": 1, "queue": 1, "timeout": 0.05}}
+
+
+def request(middleware, path="/api/anything"):
+    """Run one request through the middleware and return (status, headers)"""
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        await middleware(scope, receive, send)
+        start = next(message for message in messages if message["type"] == "http.response.start")
+        headers = {key.decode(): value.decode() for key, value in start["headers"]}
+        return start["status"], headers
+    return run()
+
+
+class HeldApp:
+    """Downstream app that holds every request until released, optionally raising"""
+
+    def __init__(self, fail: bool = False):
+        self.release = asyncio.Event()
+        self.started = 0
+        self.fail = fail
+
+    async def __call__(self, scope, receive, send):
+        self.started += 1
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("handler failed")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+def middleware_for(app):
+    return AdmissionControlMiddleware(app, AdmissionController(TINY_LIMITS, route_classes=[]))
+
+
+def test_limiter_rejects_when_queue_is_full():
+    async def run():
+        limiter = RouteClassLimiter("tiny", limit=1, queue=1, timeout=1.0)
+        assert await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+        assert not await limiter.acquire()
+        limiter.release()
+        assert await queued
+        limiter.release()
+        return limiter.snapshot()
+
+    snapshot = asyncio.run(run())
+    assert snapshot["rejected_queue_full"] == 1
+    assert snapshot["admitted"] == 2
+    assert snapshot["active"] == 0 and snapshot["queue_depth"] == 0
+
+
+def test_limiter_rejects_after_queueing_deadline():
+    async def run():
+        limiter = RouteClassLimiter("tiny", limit=1, queue=1, timeout=0.01)
+        assert await limiter.acquire()
+        assert not await limiter.acquire()
+        return limiter.snapshot()
+
+    snapshot = asyncio.run(run())
+    assert snapshot["rejected_timeout"] == 1
+    assert snapshot["queue_depth"] == 0
+
+
+def test_shed_request_gets_503_with_retry_headers():
+    async def run():
+        app = HeldApp()
+        middleware = middleware_for(app)
+        held = asyncio.create_task(request(middleware))
+        queued = asyncio.create_task(request(middleware))
+        await asyncio.sleep(0)
+        shed = await request(middleware)
+        app.release.set()
+        return shed, await held, await queued
+
+    (status, headers), held, queued = asyncio.run(run())
+    assert status == 503
+    assert headers["retry-after"] == "1"
+    assert headers["x-queue-depth"] == "1"
+    assert held[0] == 200 and queued[0] == 200
+
+
+def test_queued_request_past_deadline_gets_503():
+    async def run():
+        app = HeldApp()
+        middleware = middleware_for(app)
+        held = asyncio.create_task(request(middleware))
+        await asyncio.sleep(0)
+        timed_out = await request(middleware)
+        app.release.set()
+        await held
+        return timed_out
+
+    status, headers = asyncio.run(run())
+    assert status == 503
+    assert headers["x-queue-depth"] == "0"
+
+
+def test_slot_is_released_when_handler_raises():
+    async def run():
+        app = HeldApp(fail=True)
+        middleware = middleware_for(app)
+        app.release.set()
+        with pytest.raises(RuntimeError):
+            await request(middleware)
+        limiter = middleware.controller.limiters["default"]
+        assert limiter.active == 0
+        app.fail = False
+        return await request(middleware)
+
+    status, _ = asyncio.run(run())
+    assert status == 200
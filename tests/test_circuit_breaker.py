@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+from pymongo.errors import AutoReconnect, DuplicateKeyError, OperationFailure, ServerSelectionTimeoutError
+
+import degraded
+from degraded import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(degraded.time, "monotonic", fake)
+    return fake
+
+
+def make_breaker():
+    return CircuitBreaker(window=4, min_calls=4, error_rate=0.5, reset_seconds=10)
+
+
+async def call(breaker, error=None):
+    async with breaker:
+        if error is not None:
+            raise error
+
+
+def run(breaker, error=None):
+    try:
+        asyncio.run(call(breaker, error))
+    except Exception as e:
+        return e
+    return None
+
+
+def test_stays_closed_below_min_calls(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        run(breaker, AutoReconnect("down"))
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_opens_when_error_rate_reached(clock):
+    breaker = make_breaker()
+    run(breaker)
+    run(breaker)
+    run(breaker, AutoReconnect("down"))
+    run(breaker, ServerSelectionTimeoutError("down"))
+    assert breaker.state == CircuitBreaker.OPEN
+
+    error = run(breaker)
+    assert isinstance(error, CircuitOpenError)
+    assert error.retry_after == pytest.approx(10)
+    assert breaker.snapshot()["rejected"] == 1
+
+
+def test_timeouts_count_as_failures(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        run(breaker, asyncio.TimeoutError())
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_client_triggered_errors_do_not_open(clock):
+    breaker = make_breaker()
+    for _ in range(10):
+        run(breaker, DuplicateKeyError("E11000 duplicate key"))
+        run(breaker, OperationFailure("bad query"))
+        run(breaker, ValueError("not a database error"))
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()["failures"] == 0
+
+
+def open_breaker(breaker):
+    for _ in range(4):
+        run(breaker, AutoReconnect("down"))
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_after_reset_and_closes_on_success(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+
+    clock.now += 10
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one trial call is let through while half open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert run(breaker) is None
+
+
+def test_half_open_failure_reopens(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+
+    clock.now += 10
+    run(breaker, AutoReconnect("still down"))
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.snapshot()["opened"] == 2
+    assert isinstance(run(breaker), CircuitOpenError)
+
+
+def test_half_open_non_database_error_frees_trial(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+
+    clock.now += 10
+    run(breaker, ValueError("bad input"))
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert run(breaker) is None
+    assert breaker.state == CircuitBreaker.CLOSED
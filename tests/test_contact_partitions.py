@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+import contact_partitions
+import database
+from contact_partitions import add_months, find_contact_messages, naive_utc, partitions_between
+
+
+def test_add_months_crosses_year_boundaries():
+    assert add_months(datetime(2025, 12, 15), 1) == datetime(2026, 1, 1)
+    assert add_months(datetime(2026, 1, 31), -1) == datetime(2025, 12, 1)
+    assert add_months(datetime(2026, 3, 1), -14) == datetime(2025, 1, 1)
+    assert add_months(datetime(2026, 3, 1), 0) == datetime(2026, 3, 1)
+
+
+def test_naive_utc_converts_aware_times_and_keeps_naive_ones():
+    aware = datetime(2026, 1, 1, 1, 30, tzinfo=timezone(timedelta(hours=2)))
+    assert naive_utc(aware) == datetime(2025, 12, 31, 23, 30)
+    assert naive_utc(datetime(2026, 1, 1)) == datetime(2026, 1, 1)
+    assert naive_utc(None) is None
+
+
+@pytest.fixture
+def partitions(monkeypatch):
+    names = [
+        "contact_messages_2025_11", "contact_messages_2025_12",
+        "contact_messages_2026_01", "contact_messages_2026_02"
+    ]
+
+    async def list_partitions():
+        return names
+
+    monkeypatch.setattr(contact_partitions, "list_partitions", list_partitions)
+    return names
+
+
+def between(start=None, end=None):
+    return asyncio.run(partitions_between(start, end))
+
+
+def test_partitions_between_prunes_at_month_edges(partitions):
+    # [start, end) touching exactly one month reads only that partition
+    assert between(datetime(2025, 12, 1), datetime(2026, 1, 1)) == ["contact_messages_2025_12"]
+    assert between(datetime(2025, 12, 31, 23, 59), datetime(2026, 1, 1, 0, 1)) == [
+        "contact_messages_2025_12", "contact_messages_2026_01"
+    ]
+    assert between(start=datetime(2026, 1, 1)) == ["contact_messages_2026_01", "contact_messages_2026_02"]
+    assert between(end=datetime(2025, 12, 1)) == ["contact_messages_2025_11"]
+    assert between() == partitions
+
+
+def test_partitions_between_accepts_aware_bounds(partitions):
+    start = datetime(2026, 1, 1, 1, 0, tzinfo=timezone(timedelta(hours=2)))
+    assert between(start, datetime(2026, 1, 1, tzinfo=timezone.utc)) == ["contact_messages_2025_12"]
+
+
+def test_find_contact_messages_merges_newest_first_with_limit(partitions, monkeypatch):
+    stored = {
+        "contact_messages_2025_12": [datetime(2025, 12, 20), datetime(2025, 12, 3)],
+        "contact_messages_2026_01": [datetime(2026, 1, 9), datetime(2026, 1, 2)],
+        "contact_messages_2026_02": [datetime(2026, 2, 1)],
+    }
+    queried = []
+
+    async def find_in_partition(name, query, limit):
+        queried.append(name)
+        return [{"created_at": created_at} for created_at in stored[name][:limit]]
+
+    monkeypatch.setattr(contact_partitions, "_find_in_partition", find_in_partition)
+    messages = asyncio.run(find_contact_messages(start=datetime(2025, 12, 1), limit=4))
+    assert sorted(queried) == sorted(stored)
+    assert [message["created_at"] for message in messages] == [
+        datetime(2026, 2, 1), datetime(2026, 1, 9), datetime(2026, 1, 2), datetime(2025, 12, 20)
+    ]
+
+
+class FailingCollection:
+    def __init__(self, *codes):
+        self.codes = codes
+
+    async def insert_many(self, documents, ordered=True):
+        raise BulkWriteError({
+            "writeErrors": [{"index": index, "code": code} for index, code in enumerate(self.codes)]
+        })
+
+
+def test_insert_skipping_duplicates_returns_rejected_indices():
+    failed = asyncio.run(database.insert_many_skipping_duplicates(FailingCollection(11000, 11000), [{}, {}, {}]))
+    assert failed == {0, 1}
+
+
+def test_insert_skipping_duplicates_reraises_other_errors():
+    with pytest.raises(BulkWriteError):
+        asyncio.run(database.insert_many_skipping_duplicates(FailingCollection(11000, 121), [{}, {}]))
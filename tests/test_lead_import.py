@@ -0,0 +1,102 @@
+import asyncio
+import io
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+import lead_import
+from lead_import import IMPORT_TARGETS, _iter_rows, _reseller_upsert, import_leads
+from models import RESELLER_APPLICATION_CREATE_ADAPTER
+
+
+def rows(text: str, file_format: str):
+    return list(_iter_rows(io.BytesIO(text.encode("utf-8")), file_format))
+
+
+def test_csv_empty_cells_are_not_provided():
+    parsed = rows("name,email,company,message\nJordan,j@example.com,,Hi\n", "csv")
+    assert parsed == [(2, {"name": "Jordan", "email": "j@example.com", "message": "Hi"})]
+
+
+def test_ndjson_skips_blank_lines_and_reports_bad_ones():
+    parsed = rows('{"name": "A", "email": "a@example.com"}\n\nnot json\n', "ndjson")
+    assert parsed[0] == (1, {"name": "A", "email": "a@example.com"})
+    line_number, error = parsed[1]
+    assert line_number == 3
+    assert isinstance(error, ValueError)
+
+
+def test_reseller_upsert_only_sets_provided_fields():
+    lead = RESELLER_APPLICATION_CREATE_ADAPTER.validate_python({"name": "Jordan", "email": "J@Example.com"})
+    key, operation = _reseller_upsert(lead)
+    update = operation._doc
+    assert set(update["$set"]) == {"name", "updated_at"}
+    assert update["$setOnInsert"]["company"] is None
+    assert update["$setOnInsert"]["email"] == "j@example.com"
+    assert key == {"email_key": update["$setOnInsert"]["email_key"]}
+
+
+class FakeResult:
+    def __init__(self, requests):
+        self.bulk_api_result = {"nUpserted": len(requests), "nModified": 0, "nMatched": 0}
+
+
+class FakeCollection:
+    def __init__(self, error_indexes=()):
+        self.requests = []
+        self.error_indexes = error_indexes
+
+    async def bulk_write(self, requests, ordered=True):
+        self.requests.extend(requests)
+        if self.error_indexes:
+            raise BulkWriteError({
+                "writeErrors": [{"index": index, "errmsg": "E11000 duplicate key"} for index in self.error_indexes],
+                "nUpserted": len(requests) - len(self.error_indexes), "nModified": 0, "nMatched": 0
+            })
+        return FakeResult(requests)
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    def install(fake):
+        async def resolve():
+            return fake
+        monkeypatch.setattr(IMPORT_TARGETS["resellers"], "collection", resolve)
+        return fake
+    return install
+
+
+def run_import(text: str, file_format: str = "csv") -> dict:
+    return asyncio.run(import_leads("resellers", io.BytesIO(text.encode("utf-8")), file_format))
+
+
+def test_last_row_wins_for_duplicate_emails_in_a_chunk(collection):
+    fake = collection(FakeCollection())
+    report = run_import("name,email\nFirst,a@example.com\nOther,b@example.com\nSecond,A@example.com\n")
+    assert report["rows"] == 3
+    assert report["upserted"] == 2
+    names = [request._doc["$set"]["name"] for request in fake.requests]
+    assert names == ["Other", "Second"]
+
+
+def test_validation_errors_are_reported_per_row(collection):
+    collection(FakeCollection())
+    report = run_import("name,email\nGood,g@example.com\nBad,not-an-email\n")
+    assert report["invalid"] == 1
+    assert report["errors"][0]["row"] == 3
+
+
+def test_bulk_write_errors_are_reported_against_their_rows(collection, monkeypatch):
+    collection(FakeCollection(error_indexes=[1]))
+    report = run_import("name,email\nA,a@example.com\nB,b@example.com\nC,c@example.com\n")
+    assert report["upserted"] == 2
+    assert report["invalid"] == 1
+    assert report["errors"] == [{"row": 3, "errors": [{"msg": "E11000 duplicate key"}]}]
+
+
+def test_chunks_are_written_separately(collection, monkeypatch):
+    fake = collection(FakeCollection())
+    monkeypatch.setattr(lead_import, "IMPORT_CHUNK_SIZE", 2)
+    report = run_import("".join(f'{{"name": "N{i}", "email": "n{i}@example.com"}}\n' for i in range(5)), "ndjson")
+    assert report["upserted"] == 5
+    assert len(fake.requests) == 5
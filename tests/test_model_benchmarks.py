@@ -0,0 +1,112 @@
+"""Per-model validation and serialization cost.
+
+Times full validation against trusted construction (model_construct) and
+python/JSON serialization for each stored entity, so regressions in the
+model layer show up as numbers rather than as request latency.
+
+    pytest tests/test_model_benchmarks.py --benchmark-group-by=group
+"""
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from models import (  # noqa: E402
+    SubscriptionPlan, Feature, TrialSignup, ResellerApplication, ContactMessage,
+    ResellerApplicationCreate, SUBSCRIPTION_PLAN_LIST_ADAPTER, from_db, from_create
+)
+
+NOW = datetime(2026, 1, 1)
+
+# Documents shaped like what Mongo returns for each collection
+SAMPLE_DOCUMENTS = {
+    SubscriptionPlan: {
+        "id": "plan_3_months", "duration": "3 Months", "price": 25.0, "original_price": 45.0,
+        "popular": True, "features": ["25,000+ Live Channels", "100,000+ VOD Titles", "4K Ultra HD Quality",
+                                      "Multi-Device Access", "24/7 Customer Support", "Priority Support"],
+        "color": "from-purple-500 to-pink-600", "button_text": "Most Popular",
+        "created_at": NOW, "updated_at": NOW
+    },
+    Feature: {
+        "id": "feature_vod", "title": "100,000+ VOD Titles", "description": "Massive library",
+        "icon": "🎬", "color": "from-purple-500 to-pink-600", "order": 2, "active": True,
+        "created_at": NOW, "updated_at": NOW
+    },
+    TrialSignup: {
+        "id": "trial-1", "email": "user@example.com", "status": "active", "trial_start": NOW,
+        "trial_end": None, "activated": False, "activation_code": "0" * 32,
+        "created_at": NOW, "updated_at": NOW
+    },
+    ResellerApplication: {
+        "id": "reseller-1", "name": "Jordan", "email": "jordan@example.com", "company": "Acme",
+        "message": "Interested", "status": "pending", "commission_rate": 0.15,
+        "created_at": NOW, "updated_at": NOW
+    },
+    ContactMessage: {
+        "id": "message-1", "name": "Sam", "email": "sam@example.com", "subject": "Hello",
+        "message": "Question about plans", "status": "new", "created_at": NOW, "updated_at": NOW
+    }
+}
+
+MODELS = pytest.mark.parametrize("model", list(SAMPLE_DOCUMENTS), ids=lambda model: model.__name__)
+
+
+@MODELS
+def test_validate(benchmark, model):
+    benchmark.group = model.__name__
+    document = SAMPLE_DOCUMENTS[model]
+    assert benchmark(lambda: model(**document)).id == document["id"]
+
+
+@MODELS
+def test_construct(benchmark, model):
+    benchmark.group = model.__name__
+    document = SAMPLE_DOCUMENTS[model]
+    assert benchmark(from_db, model, document).id == document["id"]
+
+
+@MODELS
+def test_model_dump(benchmark, model):
+    benchmark.group = model.__name__
+    instance = model(**SAMPLE_DOCUMENTS[model])
+    assert benchmark(instance.model_dump)["id"] == instance.id
+
+
+@MODELS
+def test_model_dump_json(benchmark, model):
+    benchmark.group = model.__name__
+    instance = model(**SAMPLE_DOCUMENTS[model])
+    assert instance.id.encode() in benchmark(instance.model_dump_json).encode()
+
+
+PLANS = [SAMPLE_DOCUMENTS[SubscriptionPlan]] * 4
+
+
+def test_plan_list_validate(benchmark):
+    benchmark.group = "List[SubscriptionPlan]"
+    assert len(benchmark(SUBSCRIPTION_PLAN_LIST_ADAPTER.validate_python, PLANS)) == 4
+
+
+def test_plan_list_construct(benchmark):
+    benchmark.group = "List[SubscriptionPlan]"
+    assert len(benchmark(lambda: [from_db(SubscriptionPlan, plan) for plan in PLANS])) == 4
+
+
+def test_plan_list_dump_json(benchmark):
+    benchmark.group = "List[SubscriptionPlan]"
+    plans = SUBSCRIPTION_PLAN_LIST_ADAPTER.validate_python(PLANS)
+    assert benchmark(SUBSCRIPTION_PLAN_LIST_ADAPTER.dump_json, plans).startswith(b"[")
+
+
+PAYLOAD = ResellerApplicationCreate(name="Jordan", email="jordan@example.com")
+
+
+def test_create_handler_validate(benchmark):
+    benchmark.group = "create handler"
+    assert benchmark(lambda: ResellerApplication(**PAYLOAD.model_dump()).model_dump())["email"] == PAYLOAD.email
+
+
+def test_create_handler_construct(benchmark):
+    benchmark.group = "create handler"
+    assert benchmark(lambda: from_create(ResellerApplication, PAYLOAD).model_dump())["email"] == PAYLOAD.email
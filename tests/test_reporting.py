@@ -0,0 +1,12 @@
+from datetime import datetime, timedelta, timezone
+
+from reporting import period_bounds, period_of
+
+
+def test_period_bounds_wrap_the_year():
+    assert period_bounds("2026-12") == (datetime(2026, 12, 1), datetime(2027, 1, 1))
+
+
+def test_period_of_uses_utc():
+    assert period_of(datetime(2026, 8, 31, 23, 30)) == "2026-08"
+    assert period_of(datetime(2026, 9, 1, 1, 0, tzinfo=timezone(timedelta(hours=2)))) == "2026-08"
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "plans"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("plans", fetch) for _ in range(10)))
+
+    assert asyncio.run(scenario()) == ["plans"] * 10
+    assert len(calls) == 1
+    assert flight.snapshot() == {
+        "calls": 10, "executions": 1, "coalesced": 9, "errors": 0, "timeouts": 0, "in_flight": 0
+    }
+
+
+def test_sequential_calls_fetch_again():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    async def scenario():
+        return [await flight.do("features", fetch) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [1, 2, 3]
+
+
+def test_errors_are_shared_and_forgotten():
+    flight = SingleFlight()
+    attempts = []
+
+    async def fetch():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("database down")
+        return "ok"
+
+    async def scenario():
+        first = await asyncio.gather(*(flight.do("settings", fetch) for _ in range(3)), return_exceptions=True)
+        return first, await flight.do("settings", fetch)
+
+    first, second = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in first)
+    assert second == "ok"
+    assert flight.snapshot()["errors"] == 3
+
+
+def test_caller_timeout_does_not_cancel_shared_fetch():
+    flight = SingleFlight(timeouts={"plans": 0.01})
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "plans"
+
+    async def scenario():
+        impatient = asyncio.ensure_future(flight.do("plans", fetch))
+        patient = asyncio.ensure_future(flight.do("plans", fetch, timeout=1))
+        with pytest.raises(asyncio.TimeoutError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(scenario()) == "plans"
+    assert flight.snapshot()["timeouts"] == 1
@@ -0,0 +1,61 @@
+import asyncio
+
+import degraded
+from degraded import WriteSpool
+
+
+class FakeCollection:
+    def __init__(self, on_update=None):
+        self.documents = {}
+        self.on_update = on_update
+
+    async def update_one(self, filter, update, upsert=False):
+        if self.on_update is not None:
+            await self.on_update()
+        self.documents.setdefault(filter["id"], update["$setOnInsert"])
+
+
+class FakeDatabase:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getitem__(self, name):
+        return self.collection
+
+
+def test_replay_applies_and_removes_spool(tmp_path, monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(degraded, "db", FakeDatabase(collection))
+    spool = WriteSpool(str(tmp_path / "spool.ndjson"))
+
+    async def scenario():
+        for i in range(3):
+            await spool.spool("trial_signups", {"id": i}, {"id": i})
+        return await spool.replay()
+
+    assert asyncio.run(scenario()) == 3
+    assert sorted(collection.documents) == [0, 1, 2]
+    assert not (tmp_path / "spool.ndjson").exists()
+
+
+def test_lines_appended_by_another_worker_during_replay_are_kept(tmp_path, monkeypatch):
+    path = str(tmp_path / "spool.ndjson")
+    leader, follower = WriteSpool(path), WriteSpool(path)
+    appended = []
+
+    async def follower_append():
+        if not appended:
+            appended.append(True)
+            await follower.spool("contact_messages_2026_10", {"id": "late"}, {"id": "late"})
+
+    collection = FakeCollection(on_update=follower_append)
+    monkeypatch.setattr(degraded, "db", FakeDatabase(collection))
+
+    async def scenario():
+        await leader.spool("contact_messages_2026_10", {"id": "early"}, {"id": "early"})
+        first = await leader.replay()
+        second = await leader.replay()
+        return first, second
+
+    assert asyncio.run(scenario()) == (1, 1)
+    assert sorted(collection.documents) == ["early", "late"]